@@ -20,7 +20,13 @@ intepreter.
 
 from search import *
 
+#The actions, stored in states as small integers: indices into ACTION_NAMES
+(EMPTY3, FILL3, EMPTY4, FILL4, POUR34, POUR43) = range(6)
+ACTION_NAMES = ('Empty 3 Gallon', 'Fill 3 Gallon', 'Empty 4 Gallon',
+                'Fill 4 Gallon', 'Pour 3 into 4', 'Pour 4 into 3')
+
 class WaterJugs(StateSpace):
+    __slots__ = ('gal3', 'gal4')
 
     def __init__(self, action, gval, gal3, gal4, parent = None):
         StateSpace.__init__(self, action, gval, parent)
@@ -37,29 +43,63 @@ class WaterJugs(StateSpace):
 
         States = list()
         if self.gal3 > 0 :
-            States.append( WaterJugs('Empty 3 Gallon', self.gval+1, 0, self.gal4, self) )
+            States.append( WaterJugs(EMPTY3, self.gval+1, 0, self.gal4, self) )
         if self.gal3 < 3 :
-            States.append( WaterJugs('Fill 3 Gallon', self.gval+1, 3, self.gal4, self) )
+            States.append( WaterJugs(FILL3, self.gval+1, 3, self.gal4, self) )
         if self.gal4 > 0 :
-            States.append( WaterJugs('Empty 4 Gallon', self.gval+1, self.gal3, 0, self) )
+            States.append( WaterJugs(EMPTY4, self.gval+1, self.gal3, 0, self) )
         if self.gal4 < 4 :
-            States.append( WaterJugs('Fill 4 Gallon', self.gval+1, self.gal3, 4, self) )
+            States.append( WaterJugs(FILL4, self.gval+1, self.gal3, 4, self) )
         if self.gal4 < 4 and self.gal3 > 0:
             maxpour = min( 4 - self.gal4, self.gal3 ) #at most can only fill up 4 gallon
-            States.append( WaterJugs('Pour 3 into 4', self.gval+1, self.gal3-maxpour, self.gal4+maxpour, self) )
+            States.append( WaterJugs(POUR34, self.gval+1, self.gal3-maxpour, self.gal4+maxpour, self) )
         if self.gal3 < 3 and self.gal4 > 0:
             maxpour = min( 3 - self.gal3, self.gal4 ) #at most can only fill up 3 gallon
-            States.append( WaterJugs('Pour 4 into 3', self.gval+1, self.gal3+maxpour, self.gal4-maxpour, self) )
+            States.append( WaterJugs(POUR43, self.gval+1, self.gal3+maxpour, self.gal4-maxpour, self) )
+        return States
+
+    def predecessors(self):
+        """The states that have self as a successor (used by the
+        'bidirectional' strategy), each with the action leading to self,
+        gval self.gval+1 and parent self."""
+
+        States = list()
+        (gal3, gal4) = (self.gal3, self.gal4)
+        if gal3 == 0:
+            for x in range(1, 4):
+                States.append( WaterJugs(EMPTY3, self.gval+1, x, gal4, self) )
+        if gal3 == 3:
+            for x in range(0, 3):
+                States.append( WaterJugs(FILL3, self.gval+1, x, gal4, self) )
+        if gal4 == 0:
+            for y in range(1, 5):
+                States.append( WaterJugs(EMPTY4, self.gval+1, gal3, y, self) )
+        if gal4 == 4:
+            for y in range(0, 4):
+                States.append( WaterJugs(FILL4, self.gval+1, gal3, y, self) )
+        #pouring 3 into 4 from (x, y) gives (max(0, x+y-4), min(4, x+y)),
+        #pouring 4 into 3 gives (min(3, x+y), max(0, x+y-3))
+        for x in range(0, 4):
+            for y in range(0, 5):
+                if x > 0 and y < 4 and (max(0, x+y-4), min(4, x+y)) == (gal3, gal4):
+                    States.append( WaterJugs(POUR34, self.gval+1, x, y, self) )
+                if x < 3 and y > 0 and (min(3, x+y), max(0, x+y-3)) == (gal3, gal4):
+                    States.append( WaterJugs(POUR43, self.gval+1, x, y, self) )
         return States
 
+    def action_name(self):
+        if isinstance(self.action, int):
+            return ACTION_NAMES[self.action]
+        return self.action
+
     def hashable_state(self) :
         return (self.gal3, self.gal4)
 
     def print_state(self):
         if self.parent:
-            print("Action= \"{}\", S{}, g-value = {}, (3gal, 4gal) = ({},{}), (From S{})".format(self.action, self.index, self.gval, self.gal3, self.gal4, self.parent.index))
+            print("Action= \"{}\", S{}, g-value = {}, (3gal, 4gal) = ({},{}), (From S{})".format(self.action_name(), self.index, self.gval, self.gal3, self.gal4, self.parent.index))
         else:
-            print("Action=\"{}\", S{}, g-value = {}, (3gal, 4gal) = ({},{}), (Initial state)".format(self.action, self.index, self.gval, self.gal3, self.gal4))
+            print("Action=\"{}\", S{}, g-value = {}, (3gal, 4gal) = ({},{}), (Initial state)".format(self.action_name(), self.index, self.gval, self.gal3, self.gal4))
 
 
 #Some auxillary heuristic functions and goal test functions.
@@ -74,6 +114,19 @@ def waterjugs_set_goal(gal3, gal4):
     WaterJugs.goal_state = (gal3, gal4)
 
 
+def waterjugs_goal_state():
+    '''Return the current goal as a state (for the 'bidirectional'
+    strategy). The goal must not have wild cards.'''
+    return WaterJugs("GOAL", 0, WaterJugs.goal_state[0], WaterJugs.goal_state[1])
+
+def waterjugs_encode(state):
+    '''Return (gal3, gal4) for state (for SearchEngine.set_checkpoint)'''
+    return (state.gal3, state.gal4)
+
+def waterjugs_decode(data, root):
+    '''Inverse of waterjugs_encode'''
+    return WaterJugs(None, 0, data[0], data[1])
+
 def waterjugs_goal_fn(state):
     '''test if the state is equal to the current goal,
     allow wild cards '*' in the goal state'''
@@ -0,0 +1,341 @@
+'''Parallel search routines built on SearchEngine (see search.py).
+
+   A) portfolio_search
+
+      Race several search configurations---(strategy, cycle check level,
+      heuristic) triples---on the same initial state, each in its own
+      worker process, and return the first solution found. The remaining
+      searches are cancelled.
+
+   B) batch_search
+
+      Solve many independent problems over a pool of worker processes,
+      yielding each SearchResult as it finishes.
+
+   C) hda_star
+
+      Hash distributed A*: a single A* search split over several worker
+      processes. Each worker owns the states whose hashable_state hashes
+      to it, keeps its own OPEN and cycle check dictionary for them, and
+      sends the successors it generates to their owners in batches. The
+      cost of the best solution found so far is shared with every worker,
+      and the search stops only when no worker has a node on OPEN with a
+      lower fval and no batch of successors is in transit, so (with an
+      admissible heuristic) the solution returned is optimal.
+
+   States, goal functions and heuristic functions are sent to worker
+   processes, so they must be picklable (define them at the top level of
+   a module). Problem data kept in class attributes, e.g., the goal set
+   by waterjugs_set_goal, is only inherited by the workers when processes
+   are forked; otherwise pass an initializer (and initargs) that sets it
+   up in each worker.
+'''
+import copy
+import heapq
+import itertools
+import multiprocessing
+import queue
+import time
+import zlib
+from search import *
+from search import _zero_hfn, _dumps_key, _relink_path
+
+
+def _solve(job):
+    '''Run one quiet search in a worker process. job is the tuple
+       (index, initState, goal_fn, heur_fn, strategy, cc_level, limits)
+       and the pair (index, SearchResult) is returned.'''
+    (index, initState, goal_fn, heur_fn, strategy, cc_level, limits) = job
+    se = SearchEngine(strategy, cc_level)
+    return index, se.search(initState, goal_fn, heur_fn, quiet=True, **limits)
+
+
+def portfolio_search(initState, goal_fn, configs, processes = None,
+                     node_limit = None, time_limit = None, memory_limit = None,
+                     initializer = None, initargs = ()):
+    '''Run a search from initState for each configuration in configs, a
+       list of (strategy, cc_level, heur_fn) triples (heur_fn may be None
+       for uninformed search), in a pool of worker processes (by default
+       one per configuration). The budgets are applied to each search.
+
+       Return the pair (config, result) for the first search to find a
+       goal, where result is its SearchResult; the other searches are
+       terminated. If no search finds a goal return (None, result) where
+       result is the SearchResult of the last search to finish.'''
+
+    jobs = []
+    for (i, (strategy, cc_level, heur_fn)) in enumerate(configs):
+        limits = {'node_limit': node_limit, 'time_limit': time_limit, 'memory_limit': memory_limit}
+        jobs.append((i, initState, goal_fn, heur_fn or _zero_hfn, strategy, cc_level, limits))
+    if processes is None:
+        processes = len(jobs)
+
+    result = None
+    with multiprocessing.Pool(processes, initializer, initargs) as pool:
+        for (i, result) in pool.imap_unordered(_solve, jobs):
+            if result:
+                #leaving the with block terminates the other workers
+                return configs[i], result
+    return None, result
+
+
+def batch_search(initStates, goal_fn, heur_fn = None, strategy = 'astar',
+                 cc_level = 'default', processes = None, chunksize = 4,
+                 node_limit = None, time_limit = None, memory_limit = None,
+                 initializer = None, initargs = ()):
+    '''Search from each state in the iterable initStates, using the given
+       strategy, cycle check level and heuristic (None for uninformed
+       search), in a pool of worker processes (by default one per CPU).
+       States are sent to the workers chunksize at a time. The budgets
+       are applied to each search.
+
+       This is a generator: it yields a pair (index, result) for each
+       search as it finishes, where index is the position of the initial
+       state in initStates and result is its SearchResult. Closing the
+       generator early terminates the outstanding searches.'''
+
+    limits = {'node_limit': node_limit, 'time_limit': time_limit, 'memory_limit': memory_limit}
+    jobs = ((i, initState, goal_fn, heur_fn or _zero_hfn, strategy, cc_level, limits)
+            for (i, initState) in enumerate(initStates))
+    with multiprocessing.Pool(processes, initializer, initargs) as pool:
+        for (i, result) in pool.imap_unordered(_solve, jobs, chunksize):
+            yield i, result
+
+
+#Workers check their inbox (and answer termination probes) after this many
+#expansions
+_HDA_CHUNK = 64
+
+def _hda_owner(key, n):
+    '''The number of the worker owning the state with hashable_state key.
+       hash() of strings differs between processes (unless they are
+       forked), so the hash is taken of the pickled key.'''
+    return zlib.crc32(_dumps_key(key)) % n
+
+def _hda_worker(number, inboxes, results, goal_fn, heur_fn, batch_size,
+                initializer, initargs):
+    '''Body of hda_star worker number. Messages read from
+       inboxes[number]:
+         ('nodes', batch)  a list of (state, parent_key) pairs; state has
+                           no parent link, parent_key is the hashable_state
+                           of its parent (None for the initial state)
+         ('bound', cost)   the cost of the best solution found
+         ('probe', wave)   reply ('status', number, wave, idle, sent,
+                           received, nodes) on results
+         ('path', key)     reply ('path', state, parent_key) on results
+         ('stop',)         reply ('stats', ...) on results and return
+       Solutions are reported as ('goal', gval, key) on results.'''
+    if initializer is not None:
+        initializer(*initargs)
+    inbox = inboxes[number]
+    n = len(inboxes)
+    table = dict()  #hashable_state -> (gval, parent_key, state)
+    OPEN = []       #heap of (fval, -gval, count, key, state)
+    out = [[] for i in range(n)]
+    bound = None
+    sent = received = 0
+    nodes = generated = pruned = max_open = 0
+    count = itertools.count()
+
+    def add(state, parent_key):
+        nonlocal nodes, pruned, max_open
+        key = state.key()
+        old = table.get(key)
+        if old is not None and old[0] <= state.gval:
+            pruned += 1
+            return
+        table[key] = (state.gval, parent_key, state)
+        nodes += 1
+        hval = heur_fn(state)
+        heapq.heappush(OPEN, (state.gval + hval, -state.gval, next(count), key, state))
+        if len(OPEN) > max_open:
+            max_open = len(OPEN)
+
+    def flush(i):
+        nonlocal sent
+        inboxes[i].put(('nodes', out[i]))
+        out[i] = []
+        sent += 1
+
+    while True:
+        busy = OPEN and (bound is None or OPEN[0][0] < bound)
+        try:
+            msg = inbox.get(block=not busy)
+        except queue.Empty:
+            msg = None
+        while msg is not None:
+            if msg[0] == 'nodes':
+                received += 1
+                for (state, parent_key) in msg[1]:
+                    add(state, parent_key)
+            elif msg[0] == 'bound':
+                if bound is None or msg[1] < bound:
+                    bound = msg[1]
+            elif msg[0] == 'probe':
+                for i in range(n):
+                    if out[i]:
+                        flush(i)
+                idle = not OPEN or (bound is not None and OPEN[0][0] >= bound)
+                results.put(('status', number, msg[1], idle, sent, received, nodes))
+            elif msg[0] == 'path':
+                (gval, parent_key, state) = table[msg[1]]
+                results.put(('path', state, parent_key))
+            elif msg[0] == 'stop':
+                #batches left unread (if the search ran out of budget) are
+                #dropped rather than waited for
+                for box in inboxes:
+                    box.cancel_join_thread()
+                results.put(('stats', nodes, generated, pruned, max_open, time.process_time()))
+                return
+            try:
+                msg = inbox.get_nowait()
+            except queue.Empty:
+                msg = None
+
+        for e in range(_HDA_CHUNK):
+            if not OPEN or (bound is not None and OPEN[0][0] >= bound):
+                break
+            (fval, neg_gval, c, key, state) = heapq.heappop(OPEN)
+            if table[key][0] != state.gval:
+                continue  #a cheaper path to this state was found later
+            if goal_fn(state):
+                bound = state.gval
+                results.put(('goal', state.gval, key))
+                continue
+            successors = state.successors()
+            generated += len(successors)
+            for succ in successors:
+                succ.parent = None
+                i = _hda_owner(succ.key(), n)
+                if i == number:
+                    add(succ, key)
+                else:
+                    out[i].append((succ, key))
+                    if len(out[i]) >= batch_size:
+                        flush(i)
+        for i in range(n):
+            if out[i]:
+                flush(i)
+
+
+def hda_star(initState, goal_fn, heur_fn = None, processes = None,
+             batch_size = 64, node_limit = None, time_limit = None,
+             initializer = None, initargs = ()):
+    '''Search for an optimal path from initState to a goal with A*
+       distributed over processes worker processes (by default one per
+       CPU), see C) above. heur_fn must be admissible for the solution to
+       be optimal (it need not be consistent: states reached again by a
+       cheaper path are reopened). Successors for another worker are sent
+       batch_size at a time. node_limit bounds the total number of nodes
+       created by the workers (checked every termination probe, so it
+       can be overshot a little) and time_limit the elapsed time.
+
+       Returns a SearchResult; its nodes_expanded, states_generated and
+       cycle_check_pruned are summed over the workers, max_open is the
+       sum of their peak OPEN sizes and cpu_time includes the workers.
+
+       Termination: the parent process repeatedly probes every worker for
+       its counts of batches sent and received and whether it is idle (no
+       node on its OPEN with fval below the best solution cost). The
+       search is over when two consecutive rounds of probes find every
+       worker idle with the same counts, and the batches sent equal the
+       batches received: then no batch is in transit, and no worker
+       became active between the rounds.'''
+    heur_fn = heur_fn or _zero_hfn
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    strategy = 'hda_star with {} processes'.format(processes)
+    if goal_fn(initState):
+        return SearchResult(initState, strategy, time.perf_counter() - start_wall,
+                            time.process_time() - start_cpu, 1, 1, 0, 1)
+
+    inboxes = [multiprocessing.Queue() for i in range(processes)]
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_hda_worker,
+                                       args=(i, inboxes, results, goal_fn, heur_fn,
+                                             batch_size, initializer, initargs),
+                                       daemon=True)
+               for i in range(processes)]
+    for w in workers:
+        w.start()
+    try:
+        root = copy.copy(initState)
+        root.parent = None
+        inboxes[_hda_owner(root.key(), processes)].put(('nodes', [(root, None)]))
+        bound = goal_key = None
+        exhausted = None
+        wave = 0
+        status = dict()
+        last = None
+        for box in inboxes:
+            box.put(('probe', wave))
+        while True:
+            try:
+                msg = results.get(timeout=0.1)
+            except queue.Empty:
+                for w in workers:
+                    if w.exitcode is not None:
+                        raise RuntimeError("hda_star worker exited with code {}".format(w.exitcode))
+                msg = None
+            if msg is not None and msg[0] == 'goal':
+                if bound is None or msg[1] < bound:
+                    (bound, goal_key) = (msg[1], msg[2])
+                    for box in inboxes:
+                        box.put(('bound', bound))
+            elif msg is not None and msg[0] == 'status' and msg[2] == wave:
+                status[msg[1]] = msg[3:]
+                if len(status) == processes:
+                    #a complete round; the initial batch was sent by this process
+                    counts = [status[i] for i in range(processes)]
+                    sent = 1 + sum(s[1] for s in counts)
+                    received = sum(s[2] for s in counts)
+                    if all(s[0] for s in counts) and sent == received and counts == last:
+                        break
+                    if node_limit is not None and sum(s[3] for s in counts) >= node_limit:
+                        exhausted = 'node_limit'
+                        break
+                    last = counts
+                    status = dict()
+                    wave += 1
+                    for box in inboxes:
+                        box.put(('probe', wave))
+            if time_limit is not None and time.perf_counter() - start_wall > time_limit:
+                exhausted = 'time_limit'
+                break
+
+        #rebuild the solution path by asking the owner of each state on it
+        #for its parent
+        goal = None
+        if goal_key is not None and exhausted is None:
+            path = []
+            key = goal_key
+            while key is not None:
+                inboxes[_hda_owner(key, processes)].put(('path', key))
+                msg = results.get()
+                while msg[0] != 'path':
+                    msg = results.get()
+                (state, key) = msg[1:]
+                path.append(state)
+            path.reverse()
+            goal = _relink_path(path)
+
+        for box in inboxes:
+            box.put(('stop',))
+        stats = []
+        while len(stats) < processes:
+            msg = results.get()
+            if msg[0] == 'stats':
+                stats.append(msg[1:])
+        for w in workers:
+            w.join(1)
+    finally:
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+
+    return SearchResult(goal, strategy, time.perf_counter() - start_wall,
+                        time.process_time() - start_cpu + sum(s[4] for s in stats),
+                        sum(s[0] for s in stats), 1 + sum(s[1] for s in stats),
+                        sum(s[2] for s in stats), sum(s[3] for s in stats), exhausted)
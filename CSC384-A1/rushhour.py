@@ -11,6 +11,117 @@ rushhour STATESPACE
 
 from search import *
 from random import randint
+import weakref
+
+#The moves (vehicle name, direction) used as actions, one tuple per move
+#shared by every state generated by it.
+_moves = dict()
+
+_OPPOSITE = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
+
+def _move(name, direction):
+    '''Return the shared (name, direction) tuple for a move'''
+    move = (name, direction)
+    return _moves.setdefault(move, move)
+
+#The puzzles (static vehicle data and board) of the states in use, one
+#_Puzzle object per puzzle shared by all its states. The states hold
+#the puzzle, so it is dropped once none of them is left.
+_puzzles = weakref.WeakValueDictionary()
+
+def _puzzle(vehicles, board):
+    '''Return the shared _Puzzle for the vehicles (a tuple of (name,
+    length, is_horizontal, is_goal) tuples) on board'''
+    spec = (vehicles, board)
+    puzzle = _puzzles.get(spec)
+    if puzzle is None:
+        puzzle = _puzzles.setdefault(spec, _Puzzle(vehicles, board))
+    return puzzle
+
+class _Puzzle:
+    '''The data of a rushhour puzzle that is the same in all its states:
+    the name, length, orientation and goal flag of each vehicle, the
+    board properties, and tables precomputed from them.
+
+    A state only holds the position of each vehicle and the cells
+    occupied by all of them. A position is the cell number y*n + x of
+    the vehicle's location (x, y) on a board of m rows and n columns,
+    and the occupied cells are an integer with bit y*n + x set for each
+    occupied cell. The tables are indexed by vehicle and position:
+        masks[i][p]      the bitmask of the cells vehicle i covers at p
+        moves[i][p]      (entered, q, action) for each move of vehicle i
+                         at p: the bitmask of the cell it moves into,
+                         its new position and the move
+        goal_at[i][p]    True iff goal vehicle i is at the goal at p
+        min_moves[i][p]  heur_min_moves for goal vehicle i at p
+    Wrapping around the edges of the board is worked out once, when the
+    tables are built, so moving a vehicle is a few bit operations.'''
+
+    def __init__(self, vehicles, board):
+        self.vehicles = vehicles
+        self.board = board
+        ((m, n), goal_entrance, goal_direction) = board
+        self.n = n
+        cells = m * n
+
+        self.masks = []
+        self.moves = []
+        self.goal_at = []
+        self.min_moves = []
+        for (name, length, is_horizontal, is_goal) in vehicles:
+            masks = []
+            for p in range(cells):
+                (x, y) = (p % n, p // n)
+                mask = 0
+                for i in range(length):
+                    if is_horizontal:
+                        mask = mask | (1 << (y*n + (x + i) % n))
+                    else:
+                        mask = mask | (1 << (((y + i) % m)*n + x))
+                masks.append(mask)
+            self.masks.append(masks)
+
+            #a horizontal vehicle moves 'W' (towards higher x) and then
+            #'E', a vertical one 'S' (towards lower y) and then 'N'
+            moves = []
+            for p in range(cells):
+                (x, y) = (p % n, p // n)
+                if is_horizontal:
+                    moves.append(((1 << (y*n + (x + length) % n), y*n + (x + 1) % n, _move(name, 'W')),
+                                  (1 << (y*n + (x - 1) % n), y*n + (x - 1) % n, _move(name, 'E'))))
+                else:
+                    moves.append(((1 << (((y - 1) % m)*n + x), ((y - 1) % m)*n + x, _move(name, 'S')),
+                                  (1 << (((y + length) % m)*n + x), ((y + 1) % m)*n + x, _move(name, 'N'))))
+            self.moves.append(moves)
+
+            if is_goal:
+                self.goal_at.append([_at_goal((p % n, p // n), length, board) for p in range(cells)])
+                self.min_moves.append([_min_moves((p % n, p // n), length, board) for p in range(cells)])
+            else:
+                self.goal_at.append(None)
+                self.min_moves.append(None)
+        self.goals = [i for (i, v) in enumerate(vehicles) if v[3]]
+
+    def __reduce__(self):
+        #pickled states refer to their puzzle by its data, and unpickling
+        #gives back the shared _Puzzle
+        return (_puzzle, (self.vehicles, self.board))
+
+    def position(self, loc):
+        '''Return the position of location loc = (x, y)'''
+        return loc[1]*self.n + loc[0]
+
+    def location(self, p):
+        '''Return the location (x, y) of position p'''
+        return (p % self.n, p // self.n)
+
+    def occupied(self, positions):
+        '''Return the bitmask of the cells covered by the vehicles at
+        positions'''
+        occupied = 0
+        for (masks, p) in zip(self.masks, positions):
+            occupied = occupied | masks[p]
+        return occupied
 
 ##################################################
 # The search space class 'rushhour'             #
@@ -19,76 +130,82 @@ from random import randint
 
 
 class rushhour(StateSpace):
-    def __init__(self, action, gval, parent, vehicles, board):
-        """Initialize a rushhour search state object."""
-        StateSpace.__init__(self, action, gval, parent)
-        self.vehicles = vehicles
-        self.board = board
+    __slots__ = ('puzzle', 'positions', 'occupied')
 
-        rushhour_set_goal(self.board[1], self.board[2])
+    def __init__(self, action, gval, parent, puzzle, positions, occupied):
+        """Initialize a rushhour search state object: the vehicles of
+        puzzle (a _Puzzle) are at positions (a tuple with the position of
+        each vehicle), covering the cells in the bitmask occupied."""
+        StateSpace.__init__(self, action, gval, parent)
+        self.puzzle = puzzle
+        self.positions = positions
+        self.occupied = occupied
 
     def successors(self):
         '''Return list of rushhour objects that are the successors of the current object.
 
         Each vehicle can move in two directions based on their is_horizontal property.
         If horizontal, they can move E and W. If vertical, they can move N and S.
+        A vehicle can move if the cell it moves into is not covered by
+        another vehicle.
 
         '''
         States = list()
-        board = self.get_board_properties()
-        board_x = board[0][1]
-        board_y = board[0][0]
-
-        vehiclelist = self.get_vehicle_statuses()
-
-        for current_vehicle in vehiclelist:
-            vehiclecopy = list(vehiclelist) #vehicle list copy
-            if current_vehicle[3]: #horizontal
-                if can_move(vehiclecopy, current_vehicle, 'W', board):
-                    vehiclecopy.remove(current_vehicle)
-                    v_length = current_vehicle[2]
-                    x = current_vehicle[1][0] + 1 #vehicle's x coordinate + the amount of space it wants to move
-                    if x >= board_x: #if adding 1 space brings it off the board coordinates
-                        x = x - board_x
-                    vehiclecopy.insert(0, [current_vehicle[0], (x, current_vehicle[1][1]), current_vehicle[2], current_vehicle[3], current_vehicle[4]])
-                    States.append(rushhour("move_vehicle("+current_vehicle[0]+", 'W')", self.gval+1, self, vehiclecopy, board))
-                    vehiclecopy = list(vehiclelist)
-                if can_move(vehiclecopy, current_vehicle, 'E', board):
-                    vehiclecopy.remove(current_vehicle)
-                    x = current_vehicle[1][0] - 1
-                    if x < 0:
-                        x = board_x + x
-                    vehiclecopy.insert(0, [current_vehicle[0], (x, current_vehicle[1][1]), current_vehicle[2], current_vehicle[3], current_vehicle[4]])
-                    States.append(rushhour("move_vehicle("+current_vehicle[0]+", 'E')", self.gval+1, self, vehiclecopy, board))
-            else:
-                if can_move(vehiclecopy, current_vehicle, 'S', board):
-                    vehiclecopy.remove(current_vehicle)
-                    y = current_vehicle[1][1] - 1
-                    if y < 0:
-                        y = board_y + y
-                    vehiclecopy.insert(0, [current_vehicle[0], (current_vehicle[1][0], y), current_vehicle[2], current_vehicle[3], current_vehicle[4]])
-                    States.append(rushhour("move_vehicle("+current_vehicle[0]+", 'S')", self.gval+1, self, vehiclecopy, board))
-                    vehiclecopy = list(vehiclelist)
-                if can_move(vehiclecopy, current_vehicle, 'N', board):
-                    vehiclecopy.remove(current_vehicle)
-                    y = current_vehicle[1][1] + 1
-                    if y >= board_y:
-                        y = y - board_y
-                    vehiclecopy.insert(0, [current_vehicle[0], (current_vehicle[1][0], y), current_vehicle[2], current_vehicle[3], current_vehicle[4]])
-                    States.append(rushhour("move_vehicle("+current_vehicle[0]+", 'N')", self.gval+1, self, vehiclecopy, board))
+        puzzle = self.puzzle
+        masks = puzzle.masks
+        moves = puzzle.moves
+        positions = self.positions
+        occupied = self.occupied
+        gval = self.gval + 1
+
+        #the moved vehicle keeps its place in positions, so undoing a move
+        #gives back the same hashable_state
+        for (i, p) in enumerate(positions):
+            others = occupied ^ masks[i][p]
+            for (entered, q, action) in moves[i][p]:
+                if not others & entered:
+                    States.append(rushhour(action, gval, self, puzzle,
+                                           positions[:i] + (q,) + positions[i+1:],
+                                           others | masks[i][q]))
+
+        return States
 
+    def predecessors(self):
+        '''Return the list of rushhour objects that have the current
+        object as a successor (used by the 'bidirectional' strategy).
+        Every move can be undone by moving the same vehicle back, so
+        these are the successors, each with the move that leads back to
+        the current object as its action.'''
+        States = self.successors()
+        for s in States:
+            s.action = _move(s.action[0], _OPPOSITE[s.action[1]])
         return States
 
+    def action_name(self):
+        '''Return the action used to generate this state as text: a
+           move (vehicle name, direction) is rendered as
+           "move_vehicle(<name>, '<direction>')".'''
+        if isinstance(self.action, tuple):
+            return "move_vehicle({}, '{}')".format(self.action[0], self.action[1])
+        return self.action
 
     def hashable_state(self):
         '''Return a data item that can be used as a dictionary key to UNIQUELY represent the state.
 
         Return an immutable and unique representation of s (current state). This method is used by
         the search functions to check if s has been generated before (for cycle checking).
+        The positions of the vehicles are enough to tell apart the states
+        of one puzzle, which is all a search needs; what is kept across
+        searches is kept per puzzle (see problem).
 
         '''
 
-        return tuple(self.get_board_properties()), tuple(tuple(x) for x in self.get_vehicle_statuses())
+        return self.positions
+
+    def problem(self):
+        '''Return the puzzle of the state (hashable_state() only tells
+        apart the states of one puzzle)'''
+        return self.puzzle
 
     def print_state(self):
         #DO NOT CHANGE THIS FUNCTION---it will be used in auto marking
@@ -99,9 +216,9 @@ class rushhour(StateSpace):
         #your state.
 
         if self.parent:
-            print("Action= \"{}\", S{}, g-value = {}, (From S{})".format(self.action, self.index, self.gval, self.parent.index))
+            print("Action= \"{}\", S{}, g-value = {}, (From S{})".format(self.action_name(), self.index, self.gval, self.parent.index))
         else:
-            print("Action= \"{}\", S{}, g-value = {}, (Initial State)".format(self.action, self.index, self.gval))
+            print("Action= \"{}\", S{}, g-value = {}, (Initial State)".format(self.action_name(), self.index, self.gval))
 
         print("Vehicle Statuses")
         for vs in sorted(self.get_vehicle_statuses()):
@@ -125,8 +242,11 @@ class rushhour(StateSpace):
                  <length> is the length of that vehicle
                  <is_horizontal> is true iff the vehicle is oriented horizontally
                  <is_goal> is true iff the vehicle is a goal vehicle
+
+           The list is built from the state's positions on each call.
         '''
-        return self.vehicles
+        location = self.puzzle.location
+        return [[v[0], location(p), v[1], v[2], v[3]] for (v, p) in zip(self.puzzle.vehicles, self.positions)]
 
     def get_board_properties(self):
         '''Return (board_size, goal_entrance, goal_direction)
@@ -135,7 +255,7 @@ class rushhour(StateSpace):
                  goal_direction is one of 'N', 'E', 'S' or 'W' indicating
                                 the orientation of the goal
         '''
-        return self.board
+        return self.puzzle.board
 
 #############################################
 # heuristics                                #
@@ -164,33 +284,48 @@ def heur_min_moves(state):
     #You should implement this heuristic function exactly, even if it is
     #tempting to improve it.
 
-    min_moves = list()
-
-    for v in state.get_vehicle_statuses():
-        if v[4]: #goal_vehicle
-            if state.goal_state[1] == 'E': #tail needs to be in goal location
-                tail = v[1][0] + v[2] - 1
-                MOVES1 = abs(state.goal_state[0][0] - tail)
-                MOVES2 = state.get_board_properties()[0][1] - MOVES1
-                min_moves.append(min(MOVES1, MOVES2))
-            elif state.goal_state[1] == 'W': #head needs to be in goal location
-                #calculate difference between x values if it goes one direction (left)
-                head = v[1][0]
-                MOVES1 = abs(state.goal_state[0][0] - head)
-                MOVES2 = state.get_board_properties()[0][1] - MOVES1
-                min_moves.append(min(MOVES1, MOVES2))
-            elif state.goal_state[1] == 'N': #head needs to be in goal location
-                head = v[1][1]
-                MOVES1 = abs(state.goal_state[0][1] - head)
-                MOVES2 = state.get_board_properties()[0][0] - MOVES1
-                min_moves.append(min(MOVES1, MOVES2))
-            elif state.goal_state[1] == 'S': #tail needs to be in goal location
-                tail = v[1][1] + v[2] - 1
-                MOVES1 = abs(tail - state.goal_state[0][1])
-                MOVES2 = state.get_board_properties()[0][0] - MOVES1
-                min_moves.append(min(MOVES1, MOVES2))
-
-    return min(min_moves)
+    #The value for each position of each goal vehicle is worked out
+    #once per puzzle, by _min_moves (see class _Puzzle).
+
+    puzzle = state.puzzle
+    positions = state.positions
+    return min(puzzle.min_moves[i][positions[i]] for i in puzzle.goals)
+
+
+def _min_moves(loc, length, board):
+    '''Return the heur_min_moves value of a goal vehicle of the given
+    length at location loc on board'''
+    ((m, n), goal_entrance, goal_direction) = board
+    if goal_direction == 'E': #tail needs to be in goal location
+        tail = loc[0] + length - 1
+        MOVES1 = abs(goal_entrance[0] - tail)
+        MOVES2 = n - MOVES1
+    elif goal_direction == 'W': #head needs to be in goal location
+        #calculate difference between x values if it goes one direction (left)
+        head = loc[0]
+        MOVES1 = abs(goal_entrance[0] - head)
+        MOVES2 = n - MOVES1
+    elif goal_direction == 'N': #head needs to be in goal location
+        head = loc[1]
+        MOVES1 = abs(goal_entrance[1] - head)
+        MOVES2 = m - MOVES1
+    elif goal_direction == 'S': #tail needs to be in goal location
+        tail = loc[1] + length - 1
+        MOVES1 = abs(tail - goal_entrance[1])
+        MOVES2 = m - MOVES1
+    return min(MOVES1, MOVES2)
+
+
+def rushhour_encode(state):
+    '''Return the vehicle positions of state, all that changes from
+    state to state (for SearchEngine.set_checkpoint)'''
+    return state.positions
+
+def rushhour_decode(positions, root):
+    '''Inverse of rushhour_encode: the state with the vehicles of the
+    initial state root at the given positions'''
+    puzzle = root.puzzle
+    return rushhour(None, 0, None, puzzle, positions, puzzle.occupied(positions))
 
 
 def rushhour_set_goal(gloc, orientation):
@@ -202,27 +337,32 @@ def rushhour_goal_fn(state):
 
     Return True if StateSpace state is a goal and False otherwise
     '''
-    for v in state.get_vehicle_statuses():
-        if v[4]: #is_goal
-            goal_vehicle = v
-            if rushhour.goal_state[1] == 'E': #tail needs to be in goal position
-                tail = goal_vehicle[1][0] + goal_vehicle[2] - 1
-                if tail >= state.get_board_properties()[0][1]:
-                    tail = tail - state.get_board_properties()[0][1]
-                if (tail, goal_vehicle[1][1]) == rushhour.goal_state[0]:
-                    return True
-
-            elif rushhour.goal_state[1] == 'S': #tail needs to be in goal position
-                tail = goal_vehicle[1][1] + goal_vehicle[2] - 1
-                if tail >= state.get_board_properties()[0][0]:
-                    tail = tail - state.get_board_properties()[0][0]
-                if (goal_vehicle[1][0], tail) == rushhour.goal_state[0]:
-                    return True
-
-            elif rushhour.goal_state[1] == 'W' or rushhour.goal_state[1] == 'N': #head needs to be in goal position
-                if (goal_vehicle[1]) == rushhour.goal_state[0]:
-                    return True
+    #whether each goal vehicle is at the goal in each position is worked
+    #out once per puzzle, by _at_goal (see class _Puzzle).
+    puzzle = state.puzzle
+    positions = state.positions
+    for i in puzzle.goals:
+        if puzzle.goal_at[i][positions[i]]:
+            return True
+    return False
 
+
+def _at_goal(loc, length, board):
+    '''Return True iff a goal vehicle of the given length at location
+    loc on board is at the goal'''
+    ((m, n), goal_entrance, goal_direction) = board
+    if goal_direction == 'E': #tail needs to be in goal position
+        tail = loc[0] + length - 1
+        if tail >= n:
+            tail = tail - n
+        return (tail, loc[1]) == goal_entrance
+    elif goal_direction == 'S': #tail needs to be in goal position
+        tail = loc[1] + length - 1
+        if tail >= m:
+            tail = tail - m
+        return (loc[0], tail) == goal_entrance
+    elif goal_direction == 'W' or goal_direction == 'N': #head needs to be in goal position
+        return loc == goal_entrance
     return False
 
 
@@ -253,7 +393,11 @@ def make_init_state(board_size, vehicle_list, goal_entrance, goal_direction):
          (c) vehicle lengths are positive integers
     '''
 
-    game = rushhour("START", 0, None, vehicle_list, (board_size, goal_entrance, goal_direction))
+    board = (board_size, goal_entrance, goal_direction)
+    rushhour_set_goal(goal_entrance, goal_direction)
+    puzzle = _puzzle(tuple((v[0], v[2], v[3], v[4]) for v in vehicle_list), board)
+    positions = tuple(puzzle.position(v[1]) for v in vehicle_list)
+    game = rushhour("START", 0, None, puzzle, positions, puzzle.occupied(positions))
     return game
 
 ########################################################
@@ -361,69 +505,5 @@ def test(nvehicles, board_size):
     se.search(s8, rushhour_goal_fn, heur_min_moves)
 
 
-def can_move(vehiclelist, vehicle, direction, board):
-    '''
-    Return True if vehicle can move in direction. Return false otherwise.
-
-    Check if potential move's new coordinates is in the occupancy list of
-    another vehicle.
-    '''
-
-    if (direction == 'N' or direction == 'S') and vehicle[3]:
-        return False
-    if (direction == 'E' or direction == 'W') and not vehicle[3]:
-        return False
-
-    #calculate occupancy list of tuples of the vehicle
-    occ = list()
-
-    for v in vehiclelist:
-        #check individual conflicts but don't include self
-        if v[0] != vehicle[0]:
-            if v[3]: #current vehicle is horizontal
-                for i in range(v[2]):
-                    x = v[1][0]
-                    y = v[1][1]
-                    if (x + i) >= board[0][1]:
-                        occ.append(((x + i) - board[0][1], y))
-                    else:
-                        occ.append((x + i, y))
-            else: #current vehicle is vertical
-                for i in range(v[2]):
-                    x = v[1][0]
-                    y = v[1][1]
-                    if y + i >= board[0][0]:
-                        occ.append((x, (y + i) - board[0][0]))
-                    else:
-                        occ.append((x, y + i))
-
-    #check if directly on another's position
-    if direction == 'W':
-        newx = vehicle[1][0] + (vehicle[2] - 1) + 1
-        if newx >= board[0][1]:
-            newx = newx - board[0][1]
-        if (newx, vehicle[1][1]) in occ:
-            return False
-    elif direction == 'E':
-        newx = vehicle[1][0] - 1
-        if newx < 0:
-            newx = board[0][1] + newx
-        if (newx, vehicle[1][1]) in occ:
-            return False
-    elif direction == 'S':
-        newy = vehicle[1][1] - 1
-        if newy < 0:
-            newy = board[0][0] + newy
-        if (vehicle[1][0], newy) in occ:
-            return False
-    elif direction == 'N':
-        newy = vehicle[1][1] + (vehicle[2] - 1) + 1
-        if newy >= board[0][0]:
-            newy = newy - board[0][0]
-        if (vehicle[1][0], newy) in occ:
-            return False
-
-    return True
-
 if __name__ == "__main__":
     test(9, (7,7))
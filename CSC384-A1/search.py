@@ -18,6 +18,13 @@
       include information specific to that problem. See WaterJugs.py for an
       example, and the Class implementation for more details.
 
+      The search routines get a state's hashable representation through
+      its key() method, which calls hashable_state() once and caches the
+      result, so the representation is built only once per state.
+      StateSpace (like sNode) stores its data items in __slots__; a
+      subclass that declares __slots__ for its own data items gets a
+      compact object layout without a per-object dictionary.
+
 
     B) class SearchEngine
 
@@ -29,27 +36,127 @@
       Open---these objects are used to store the set of unexpanded
       nodes. These objects are search strategy specific. For example,
       Open is implemented as a stack when doing depth-first search, as
-      a priority queue when doing astar search etc.
+      a priority queue when doing astar search etc. For best first and
+      astar search an IndexedOpen object (which holds at most one node
+      per state) or a BucketOpen object (an array of buckets indexed by
+      integer f-values, for unit-cost style domains) can be used
+      instead (see SearchEngine.set_open_type).
+
+      The 'ida_star' strategy (iterative deepening A*) does not use an
+      Open object at all. It runs a sequence of depth-first searches,
+      each bounded by an f-value (gval+hval) threshold, so its memory
+      use is linear in the depth of the solution.
+
+      The 'anytime_astar' strategy (anytime repairing A*, ARA*) runs
+      weighted A* searches with a decreasing heuristic weight, reusing
+      the search effort of each one in the next. It reports a sequence
+      of improving solutions, each with a bound on its suboptimality.
+
+      The 'external_astar' strategy (external memory A*) is for state
+      spaces too large for OPEN and the cycle check dictionary to fit in
+      memory. Nodes are written to sorted run files on disk, grouped in
+      (fval, gval) buckets, and duplicates are removed when a bucket is
+      expanded by merging its runs with the runs of the states already
+      expanded (delayed duplicate detection). See ExternalOpen and
+      SearchEngine.set_external.
+
+      The 'frontier_bfs' strategy (breadth first frontier search) keeps
+      only the last few layers of the search in memory, so its memory
+      grows with the widest layer rather than with every state reached.
+      Each layer also adds a compact log entry per state, the position
+      of its parent in the previous layer and its own position in the
+      parent's list of successors, from which the solution path is
+      replayed. See SearchEngine.set_frontier.
+
+      The 'beam' strategy (beam search) expands the search one depth at
+      a time, keeping only the best width nodes (by hval, or by fval) of
+      each depth. Its time and memory are bounded by width times the
+      depth of the search, but it may miss solutions and the solutions
+      it finds may not be optimal. See SearchEngine.set_beam.
+
+      The 'pea_star' strategy (partial expansion A*) finds optimal
+      solutions like astar, but when it expands a node it puts on OPEN
+      only the successors with the node's own fval, and puts the node
+      back on OPEN with the next higher fval of its successors. OPEN
+      then holds far fewer nodes, at the cost of generating successors
+      (and computing their hvals) again each time a node is expanded.
+
+      The 'bidirectional' strategy is for state spaces whose states can
+      also generate their predecessors (StateSpace.predecessors) and
+      whose goal is given as explicit goal states. It runs a forward
+      search from the initial state and a backward search from the goal
+      states, expanding the side with the smaller OPEN, and stops when
+      the best path found through a state reached by both searches is
+      known to be optimal. Without heuristics both sides are uniform cost
+      (breadth first for unit costs) searches, so each only has to reach
+      about half the depth of the solution. See
+      SearchEngine.set_bidirectional.
+
+      The 'lrta_star' strategy (real-time search, in the style of LRTA*)
+      moves an agent one action at a time. Before each move it runs a
+      lookahead astar search within a fixed node or time budget, raises
+      the hvals of the states it expanded to what the lookahead
+      learned, and moves towards the best frontier node. The time per
+      move is bounded, however hard the problem, and the learned hvals
+      are kept in a dictionary, so repeated trials (or repeated calls
+      of SearchEngine.realtime_move, e.g., to give hints) find better
+      routes. See SearchEngine.set_realtime.
 
       The main routines that the user will employ are in the SearchEngine class.
       These include the ability to set the search strategy, and to invoke
       search (using the search method). See the implementation for details.
 
+      All the bookkeeping of a search (node and state counts, the cycle
+      check dictionary, the order of OPEN) is kept in the SearchEngine
+      and its Open object; there is no class level search state. So
+      several searches can run at the same time, e.g., in a thread pool,
+      as long as each one uses its own SearchEngine.
+
+    C) class SearchResult
+
+      search normally prints the solution path and search statistics.
+      Called with quiet=True it prints nothing and returns a SearchResult
+      object instead, holding the goal state, the solution cost and
+      actions, timings and search statistics.
+
     '''
 import heapq
+from array import array
 from collections import deque
+import itertools
 import os
-
+import sys
+import copy
+import io
+import json
+import pickle
+import shutil
+import tempfile
+from collections import OrderedDict
+import time
+try:
+    import resource
+except ImportError:
+    #not available on Windows; memory limits then can't be checked
+    resource = None
+
+
+#Source of the index numbers of states (StateSpace.index). next() on an
+#itertools.count is atomic, so states can be created in several threads.
+_state_index = itertools.count()
 
 class StateSpace:
     '''Abstract class for defining State spaces for search routines'''
-    n = 0
+    __slots__ = ('action', 'gval', 'parent', 'index', '_key')
 
     def __init__(self, action, gval, parent):
         '''Problem specific state space objects must always include the data items
-           a) self.action === the name of the action used to generate
-              this state from parent. If it is the initial state a good
-              convention is to supply the action name "START"
+           a) self.action === the action used to generate this state
+              from parent. If it is the initial state a good convention
+              is to supply the action name "START". Rather than a new
+              string for every state, successors can store a compact
+              action---a small integer, or a tuple shared between
+              states---and override action_name to render it as text.
            b) self.gval === a number (integer or real) that is the cost
               of getting to this state.
            c) parent the state from which this state was generated (by
@@ -58,8 +165,9 @@ class StateSpace:
         self.action = action
         self.gval = gval
         self.parent = parent
-        self.index = StateSpace.n
-        StateSpace.n = StateSpace.n + 1
+        self._key = None
+        #a unique number identifying the state in trace output
+        self.index = next(_state_index)
 
     def successors(self):
         '''This method when invoked on a state space object must return a
@@ -70,6 +178,17 @@ class StateSpace:
 
         print("Must be over ridden.")
 
+    def predecessors(self):
+        '''Needed only by the 'bidirectional' strategy. This method when
+           invoked on a state space object must return a list of the
+           states that have self as a successor, each with the data items
+           "action" the action that generates self from it, "gval" the
+           gval of self plus the cost of that action (so gvals count the
+           cost to reach the goal, in the backward search), and parent
+           set to self.'''
+
+        print("Must be over ridden.")
+
     def hashable_state(self):
         '''This method must return an immutable and unique representation
            of the state represented by self. The return value, e.g., a
@@ -79,6 +198,31 @@ class StateSpace:
 
         print("Must be over ridden.")
 
+    def problem(self):
+        '''Return a hashable object standing for the problem the state
+           belongs to. State spaces whose hashable_state() only tells
+           apart the states of one problem override this, so that what
+           is kept across searches (the hvals learned by 'lrta_star')
+           is kept apart for each problem. By default every state
+           belongs to the same problem, None.'''
+        return None
+
+    def action_name(self):
+        '''Return the action used to generate this state as text (for
+           printing the state, and for SearchResult.actions). Must be
+           over ridden by state spaces storing actions other than
+           strings whose str() is not the action's name.'''
+        return str(self.action)
+
+    def key(self):
+        '''Return self.hashable_state(). It is computed on the first call
+           and cached, so states must not be changed once they have been
+           handed to the search routines.'''
+        key = self._key
+        if key is None:
+            key = self._key = self.hashable_state()
+        return key
+
     def print_state(self):
         '''Print a representation of the state'''
         print("Must be over ridden.")
@@ -100,9 +244,9 @@ class StateSpace:
     def has_path_cycle(self):
         '''Returns true if self is equal to a prior state on its path'''
         s = self.parent
-        hc = self.hashable_state()
+        hc = self.key()
         while s:
-            if s.hashable_state() == hc:
+            if s.key() == hc:
                 return True
             s = s.parent
         return False
@@ -112,13 +256,14 @@ _DEPTH_FIRST = 0
 _BREADTH_FIRST = 1
 _BEST_FIRST = 2
 _ASTAR = 3
-
-#For best first and astar we use a priority queue. This requires
-#a comparison function for nodes. These constants indicate if we use
-#the gval, the hval or the sum of gval and hval in the comparison.
-_SUM_HG = 0
-_H = 1
-_G = 2
+_IDA_STAR = 4
+_ANYTIME_ASTAR = 5
+_EXTERNAL_ASTAR = 6
+_FRONTIER_BFS = 7
+_BEAM = 8
+_PEA_STAR = 9
+_BIDIRECTIONAL = 10
+_LRTA_STAR = 11
 
 #Cycle Checking. Either CC_NONE 'none' (no cycle checking), CC_PATH
 #'path' (path checking only) or CC_FULL 'full' (full cycle checking,
@@ -134,56 +279,92 @@ def _zero_hfn(state):
     '''Null heuristic (zero)'''
     return 0
 
+class HeuristicCache:
+    '''A memoizing wrapper for a heuristic function. hval's are cached by
+       the state's hashable_state(), so the heuristic is evaluated once
+       per distinct state (as long as the state stays in the cache). At
+       most maxsize values are kept; when the cache is full the least
+       recently used value is evicted. hits and misses count the calls
+       answered from the cache and the calls passed on to heur_fn.'''
+
+    def __init__(self, heur_fn, maxsize):
+        self.heur_fn = heur_fn
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, state):
+        key = state.key()
+        cache = self.cache
+        if key in cache:
+            self.hits = self.hits + 1
+            cache.move_to_end(key)
+            return cache[key]
+        self.misses = self.misses + 1
+        hval = self.heur_fn(state)
+        cache[key] = hval
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return hval
+
 class sNode:
     '''Object of this class form the nodes of the search space.  Each
     node consists of a search space object (determined by the problem
     definition) along with the h and g values (the g values is
     redundant as it is stored in the state, but we make a copy in the
-    node object for convenience), and a the number of the node'''
+    node object for convenience), and a the number of the node (given
+    by the SearchEngine, counting the nodes of each search from 0)'''
 
-    n = 0
-    lt_type = _SUM_HG
+    __slots__ = ('state', 'hval', 'gval', 'index')
 
-    def __init__(self, state, hval):
+    def __init__(self, state, hval, index = 0):
         self.state = state
         self.hval = hval
         self.gval = state.gval
-        self.index = sNode.n
-        sNode.n = sNode.n + 1
+        self.index = index
 
     def __lt__(self, other):
-        '''For astar and best first we muse a priority queue for the
-           OPEN set. This queue stores search nodes waiting to be
-           expanded. Thus we need to define a node1 < node2 function
-           by defining the __lt__ function. Dependent on the type of
-           search this comparison function compares the h-value, the
-           g-value or the f-value of the nodes. Note for the f-value
-           we wish to break ties by letting node1 < node2 if they both
-           have identical f-values but if node1 has a GREATER g
-           value. This means that we expand nodes along deeper paths
-           first causing the search to proceed directly to the goal'''
-
-        if sNode.lt_type == _SUM_HG:
-            if (self.gval+self.hval) == (other.gval+other.hval):
-                #break ties by greatest gval.
-                return self.gval > other.gval
-            else: return ((self.gval+self.hval) < (other.gval+other.hval))
-        if sNode.lt_type == _G:
-            return self.gval < other.gval
-        if sNode.lt_type == _H:
-            return self.hval < other.hval
-        print('sNode class has invalid comparator setting!')
-        #return default of lowest gval (generating breadth first behavior)
-        return self.gval < other.gval
+        '''node1 < node2 if node1 has the lower f-value (gval+hval),
+           breaking ties by letting node1 < node2 if it has the GREATER
+           g value. This means that we expand nodes along deeper paths
+           first causing the search to proceed directly to the goal.
+           The OPEN sets do not rely on this function: each one orders
+           its nodes by keys of its own (see class Open).'''
+
+        if (self.gval+self.hval) == (other.gval+other.hval):
+            #break ties by greatest gval.
+            return self.gval > other.gval
+        else: return ((self.gval+self.hval) < (other.gval+other.hval))
+
+class _PendingNode(sNode):
+    '''A node whose state has not had its heuristic evaluated yet (see
+       SearchEngine.set_lazy_heuristic). Its hval is a stand-in taken
+       from its parent, so that it goes on OPEN with its parent's fval
+       (astar) or hval (best first).'''
+    __slots__ = ()
+
+class _PartialNode(sNode):
+    '''A node put back on OPEN by partial expansion A* (the 'pea_star'
+       strategy) after some of its successors were stored. Its hval is
+       not a heuristic value: gval+hval is the fval of the successors
+       still to be stored.'''
+    __slots__ = ()
 
 class Open:
     '''Open objects hold the search frontier---the set of unexpanded
        nodes. Depending on the search strategy used we want to extract
        nodes from this set in different orders, so set up the object's
        functions to operate as needed by the particular search
-       strategy'''
+       strategy. For best first and astar the priority queue holds
+       entries that carry the ordering, so nodes are never compared:
+       (hval, index, node) for best first, where ties go to the node
+       created first, and (fval, -gval, index, node) for astar, where
+       ties go to the greater gval and then to the node created
+       first.'''
 
     def __init__(self, search_strategy):
+        self.keyed = search_strategy in [_BEST_FIRST, _ASTAR]
         if search_strategy == _DEPTH_FIRST:
             #use stack for OPEN set (last in---most recent successor
             #added---is first out)
@@ -200,41 +381,700 @@ class Open:
             #use priority queue for OPEN (first out is node with
             #lowest hval)
             self.open = []
-            #set node less than function to compare hvals only
-            sNode.lt_type = _H
-            self.insert = lambda node: heapq.heappush(self.open, node)
-            self.extract = lambda: heapq.heappop(self.open)
+            heap = self.open
+            push = heapq.heappush
+            pop = heapq.heappop
+            self.insert = lambda node: push(heap, (node.hval, node.index, node))
+            self.extract = lambda: pop(heap)[2]
         elif search_strategy == _ASTAR:
             #use priority queue for OPEN (first out is node with
             #lowest fval = gval+hval)
             self.open = []
-            #set node less than function to compare sums of hval and gval
-            sNode.lt_type = _SUM_HG
-            self.insert = lambda node: heapq.heappush(self.open, node)
-            self.extract = lambda: heapq.heappop(self.open)
+            heap = self.open
+            push = heapq.heappush
+            pop = heapq.heappop
+            self.insert = lambda node: push(heap, (node.gval+node.hval, -node.gval, node.index, node))
+            self.extract = lambda: pop(heap)[3]
 
     def empty(self): return not self.open
 
+    def __len__(self): return len(self.open)
+
+    def nodes(self):
+        '''Return the nodes on OPEN, in no particular order'''
+        if self.keyed:
+            return [entry[-1] for entry in self.open]
+        return list(self.open)
+
+    def bound(self):
+        '''Return the hval (best first), fval (astar) or gval (breadth
+           first) of the next node to be extracted; None for depth first
+           or if OPEN is empty'''
+        if not self.open:
+            return None
+        if self.keyed:
+            return self.open[0][0]
+        if isinstance(self.open, deque):
+            return self.open[0].gval
+        return None
+
+    def first(self):
+        '''Return the next node to be extracted, leaving it on OPEN
+           (None if OPEN is empty)'''
+        if not self.open:
+            return None
+        if self.keyed:
+            return self.open[0][-1]
+        if isinstance(self.open, deque):
+            return self.open[0]
+        return self.open[-1]
+
     def print_open(self):
         print("{", end="")
-        if len(self.open) == 1:
-            print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(self.open[0].state.index, self.open[0].state.action, self.open[0].state.hashable_state(), self.open[0].gval, self.open[0].hval, self.open[0].gval+self.open[0].hval), end="")
+        for nd in self.nodes():
+            print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(nd.state.index, nd.state.action_name(), nd.state.key(), nd.gval, nd.hval, nd.gval+nd.hval), end="")
+        print("}")
+
+class IndexedOpen:
+    '''An OPEN set for best first and astar search that holds at most
+       one node per state. Nodes are stored in a binary heap of
+       (key, hashable_state, node) entries, where key is a precomputed
+       tuple: (hval, -gval, tiebreak) for best first, and (fval, -gval,
+       tiebreak) for astar (ties on h or f broken in favour of the
+       greater gval). The tiebreak is the node's index, so
+       keys are unique and ordering never falls back to comparing
+       nodes. A dictionary maps each hashable_state to the position of
+       its entry in the heap; inserting a node for a state that is
+       already on OPEN replaces the old node if the new node has a
+       lower gval (for astar this is a decrease-key) and is otherwise
+       discarded.'''
+
+    def __init__(self, search_strategy):
+        self.open = []
+        self.pos = dict()
+        if search_strategy == _BEST_FIRST:
+            self.key = lambda node: (node.hval, -node.gval, node.index)
         else:
-            for nd in self.open:
-                print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(nd.state.index, nd.state.action, nd.state.hashable_state(), nd.gval, nd.hval, nd.gval+nd.hval), end="")
+            self.key = lambda node: (node.gval+node.hval, -node.gval, node.index)
+
+    def empty(self): return not self.open
+
+    def __len__(self): return len(self.open)
+
+    def nodes(self):
+        '''Return the nodes on OPEN, in no particular order'''
+        return [entry[2] for entry in self.open]
+
+    def bound(self):
+        '''Return the hval (best first) or fval (astar) of the next node
+           to be extracted (None if OPEN is empty)'''
+        if not self.open:
+            return None
+        return self.open[0][0][0]
+
+    def first(self):
+        '''Return the next node to be extracted, leaving it on OPEN
+           (None if OPEN is empty)'''
+        if not self.open:
+            return None
+        return self.open[0][2]
+
+    def insert(self, node):
+        hsh = node.state.key()
+        key = self.key(node)
+        i = self.pos.get(hsh)
+        if i is None:
+            self.open.append((key, hsh, node))
+            self.pos[hsh] = len(self.open) - 1
+            self._sift_up(len(self.open) - 1)
+        elif node.gval < self.open[i][2].gval:
+            #the new node is a cheaper path to the state: replace the old
+            #node and restore the heap order around it.
+            self.open[i] = (key, hsh, node)
+            self._sift_up(i)
+            self._sift_down(self.pos[hsh])
+
+    def extract(self):
+        heap = self.open
+        last = heap.pop()
+        if not heap:
+            del self.pos[last[1]]
+            return last[2]
+        top = heap[0]
+        heap[0] = last
+        self.pos[last[1]] = 0
+        del self.pos[top[1]]
+        self._sift_down(0)
+        return top[2]
+
+    def _sift_up(self, i):
+        heap = self.open
+        pos = self.pos
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            pentry = heap[parent]
+            if entry[0] < pentry[0]:
+                heap[i] = pentry
+                pos[pentry[1]] = i
+                i = parent
+            else:
+                break
+        heap[i] = entry
+        pos[entry[1]] = i
+
+    def _sift_down(self, i):
+        heap = self.open
+        pos = self.pos
+        n = len(heap)
+        entry = heap[i]
+        child = 2*i + 1
+        while child < n:
+            right = child + 1
+            if right < n and heap[right][0] < heap[child][0]:
+                child = right
+            centry = heap[child]
+            if centry[0] < entry[0]:
+                heap[i] = centry
+                pos[centry[1]] = i
+                i = child
+                child = 2*i + 1
+            else:
+                break
+        heap[i] = entry
+        pos[entry[1]] = i
+
+    def print_open(self):
+        print("{", end="")
+        for (key, hsh, nd) in self.open:
+            print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(nd.state.index, nd.state.action_name(), hsh, nd.gval, nd.hval, nd.gval+nd.hval), end="")
         print("}")
 
+#Largest f-value (or h-value for best first) a BucketOpen keeps in
+#buckets. A node with a larger or non-integer key makes the BucketOpen
+#fall back to a heap.
+_BUCKET_LIMIT = 1 << 16
+
+class BucketOpen:
+    '''An OPEN set for best first and astar search when action costs
+       and heuristic values are small non-negative integers (e.g., the
+       unit cost actions of WaterJugs and rushhour). Nodes are kept in
+       an array of buckets indexed by fval (astar) or hval (best first).
+       Each bucket is itself an array of FIFO queues indexed by gval,
+       so ties are broken in favour of the greatest gval, as in Open,
+       and then by insertion order. Empty queues are
+       trimmed from the end of each bucket so both insert and extract
+       take constant (amortized) time.
+
+       If a node arrives whose key is not a suitable integer, the nodes
+       are moved into a heap and from then on the object behaves like
+       the Open object for the same strategy. insert and extract stay
+       the same functions throughout (the search loops look them up
+       once), and pass calls on to the heap after the switch.'''
+
+    def __init__(self, search_strategy):
+        self.buckets = []       #buckets[key][gval] is a queue of nodes
+        self.counts = []        #counts[key] is the number of nodes in buckets[key]
+        self.size = 0
+        self.min_key = 0        #no bucket below min_key holds a node
+        self.bucketed = True    #False once the nodes are moved to a heap
+        self.strategy = search_strategy
+        self.insert = self.bucket_insert
+        self.extract = self.bucket_extract
+        self.empty = lambda: self.size == 0
+
+    def bucket_insert(self, node):
+        if not self.bucketed:
+            self.heap.insert(node)
+            return
+        if self.strategy == _BEST_FIRST:
+            key = node.hval
+        else:
+            key = node.gval + node.hval
+        g = node.gval
+        if not (isinstance(key, int) and isinstance(g, int) and
+                0 <= key <= _BUCKET_LIMIT and 0 <= g <= _BUCKET_LIMIT):
+            self.use_heap()
+            self.heap.insert(node)
+            return
+        buckets = self.buckets
+        while len(buckets) <= key:
+            buckets.append([])
+            self.counts.append(0)
+        bucket = buckets[key]
+        while len(bucket) <= g:
+            bucket.append(deque())
+        bucket[g].append(node)
+        self.counts[key] = self.counts[key] + 1
+        self.size = self.size + 1
+        if key < self.min_key:
+            self.min_key = key
+
+    def bucket_extract(self):
+        if not self.bucketed:
+            return self.heap.extract()
+        counts = self.counts
+        key = self.min_key
+        while not counts[key]:
+            key = key + 1
+        self.min_key = key
+        bucket = self.buckets[key]
+        node = bucket[-1].popleft()
+        while bucket and not bucket[-1]:
+            bucket.pop()
+        counts[key] = counts[key] - 1
+        self.size = self.size - 1
+        return node
+
+    def use_heap(self):
+        '''Move all nodes into an Open object for the same strategy,
+           which from then on holds the nodes inserted.'''
+        heap = Open(self.strategy)
+        for node in self.nodes():
+            heap.insert(node)
+        self.heap = heap
+        self.buckets = []
+        self.counts = []
+        self.bucketed = False
+        self.empty = heap.empty
+
+    def __len__(self):
+        if self.bucketed:
+            return self.size
+        return len(self.heap)
+
+    def nodes(self):
+        '''Return the nodes on OPEN, in no particular order'''
+        if self.bucketed:
+            return [node for bucket in self.buckets for queue in bucket for node in queue]
+        return self.heap.nodes()
+
+    def bound(self):
+        '''Return the hval (best first) or fval (astar) of the next node
+           to be extracted (None if OPEN is empty)'''
+        if not self.bucketed:
+            return self.heap.bound()
+        if not self.size:
+            return None
+        key = self.min_key
+        while not self.counts[key]:
+            key = key + 1
+        return key
+
+    def first(self):
+        '''Return the next node to be extracted, leaving it on OPEN
+           (None if OPEN is empty)'''
+        if not self.bucketed:
+            return self.heap.first()
+        if not self.size:
+            return None
+        return self.buckets[self.bound()][-1][0]
+
+    def print_open(self):
+        print("{", end="")
+        for nd in self.nodes():
+            print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(nd.state.index, nd.state.action_name(), nd.state.key(), nd.gval, nd.hval, nd.gval+nd.hval), end="")
+        print("}")
+
+#The records of the 'external_astar' strategy are tuples
+#   (key, gval, hval, parent_key, parent_gval, state)
+#where key and parent_key are the serialized hashable_states of the
+#state and its parent (b"" for the initial state) and state is the
+#serialized state, without its parent. Sorting records sorts them by
+#key and then by gval.
+
+def _dumps_key(key):
+    '''Serialize a hashable_state. The pickler is run in fast mode (no
+       memo), so objects shared within the key are written out in full
+       and equal keys give equal bytes.'''
+    buf = io.BytesIO()
+    pickler = pickle.Pickler(buf, pickle.HIGHEST_PROTOCOL)
+    pickler.fast = True
+    pickler.dump(key)
+    return buf.getvalue()
+
+def _dumps_state(state):
+    '''Serialize state without its parent (and cached key)'''
+    s = copy.copy(state)
+    s.parent = None
+    s._key = None
+    return pickle.dumps(s, pickle.HIGHEST_PROTOCOL)
+
+def _write_run(path, records):
+    '''Write the records (already sorted) to a new run file'''
+    with open(path, 'wb') as f:
+        pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+        for record in records:
+            pickler.dump(record)
+            pickler.clear_memo()
+
+def _read_run(path):
+    '''Generate the records of a run file, in order'''
+    #a new unpickler per record: a single one would keep every record
+    #read in its memo.
+    with open(path, 'rb') as f:
+        load = pickle.load
+        while True:
+            try:
+                yield load(f)
+            except EOFError:
+                return
+
+class ExternalOpen:
+    '''The OPEN set of the 'external_astar' strategy. Records are
+       grouped in buckets indexed by (fval, gval). New records are kept
+       in memory until run_size of them have been inserted; then each
+       bucket's records are sorted and written to a run file of that
+       bucket. extract_bucket removes the bucket with the lowest fval,
+       and among those the lowest gval, and returns its records in
+       sorted order by merging its runs.'''
+
+    def __init__(self, directory, run_size):
+        self.directory = directory
+        self.run_size = run_size
+        self.buffers = dict()   #bucket -> list of records in memory
+        self.runs = dict()      #bucket -> list of run file paths
+        self.counts = dict()    #bucket -> number of records
+        self.buffered = 0
+        self.size = 0
+        self.files = 0
+
+    def empty(self): return self.size == 0
+
+    def __len__(self): return self.size
+
+    def new_path(self):
+        '''Return the path of a new run file'''
+        self.files = self.files + 1
+        return os.path.join(self.directory, "run{}".format(self.files))
+
+    def insert(self, bucket, record):
+        records = self.buffers.get(bucket)
+        if records is None:
+            records = self.buffers[bucket] = []
+            self.counts.setdefault(bucket, 0)
+        records.append(record)
+        self.counts[bucket] = self.counts[bucket] + 1
+        self.size = self.size + 1
+        self.buffered = self.buffered + 1
+        if self.buffered >= self.run_size:
+            self.flush()
+
+    def flush(self):
+        '''Write the records held in memory to run files'''
+        for (bucket, records) in self.buffers.items():
+            records.sort()
+            path = self.new_path()
+            _write_run(path, records)
+            self.runs.setdefault(bucket, []).append(path)
+        self.buffers.clear()
+        self.buffered = 0
+
+    def extract_bucket(self):
+        '''Remove the lowest bucket. Return the triple (bucket, records,
+           paths): records generates its records in sorted order (with
+           duplicates), and paths lists its run files, which the caller
+           deletes once records is exhausted.'''
+        bucket = min(self.counts)
+        self.size = self.size - self.counts.pop(bucket)
+        records = self.buffers.pop(bucket, [])
+        self.buffered = self.buffered - len(records)
+        records.sort()
+        paths = self.runs.pop(bucket, [])
+        return bucket, heapq.merge(records, *[_read_run(path) for path in paths]), paths
+
+class ExternalClosed:
+    '''The states expanded by the 'external_astar' strategy, kept on
+       disk as sorted run files grouped in layers by gval. Each
+       expanded bucket adds one run to its layer.'''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.layers = dict()    #gval -> list of run file paths
+        self.files = 0
+
+    def new_path(self):
+        '''Return the path of a new run file'''
+        self.files = self.files + 1
+        return os.path.join(self.directory, "closed{}".format(self.files))
+
+    def add_run(self, gval, path):
+        self.layers.setdefault(gval, []).append(path)
+
+    def keys(self, low_gval):
+        '''Generate, in sorted order, the keys of the states in the layers
+           with gval >= low_gval (all layers if low_gval is None)'''
+        paths = [path for (gval, runs) in self.layers.items()
+                      if low_gval is None or gval >= low_gval
+                      for path in runs]
+        return (record[0] for record in heapq.merge(*[_read_run(path) for path in paths]))
+
+    def find(self, key, gval):
+        '''Return the record of the state with the given key in layer
+           gval (None if there is none)'''
+        for path in self.layers.get(gval, []):
+            for record in _read_run(path):
+                if record[0] == key:
+                    return record
+                if record[0] > key:
+                    break
+        return None
+
+#Search budgets (see SearchEngine.search). The time and memory limits
+#are only checked once every _BUDGET_CHECK_INTERVAL expansions.
+_BUDGET_CHECK_INTERVAL = 256
+
+#A node count no search reaches (see SearchEngine.next_budget_check)
+_NO_CHECK = sys.maxsize
+
+#The search runs for at least 1/_CHECKPOINT_SHARE times as long as a
+#checkpoint took to write before the next one (see
+#SearchEngine.next_checkpoint)
+_CHECKPOINT_SHARE = 0.05
+
+#Calls of the heuristic timed for each telemetry sample
+_TELEMETRY_HEURISTIC_CALLS = 8
+
+def _rss_bytes():
+    '''Return the resident set size of this process in bytes. Where the
+       current size can't be read, return the peak size (0 if neither is
+       available).'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss          #already in bytes
+    return rss * 1024       #in kilobytes
+
+#Implementations of the OPEN set for best first and astar search.
+#_OPEN_HEAP (the default) is the heap of sNode objects in class Open,
+#_OPEN_INDEXED is class IndexedOpen, _OPEN_BUCKET is class BucketOpen.
+#_OPEN_AUTO uses a BucketOpen if the initial state's gval and hval are
+#small integers, and a heap otherwise.
+_OPEN_HEAP = 0
+_OPEN_INDEXED = 1
+_OPEN_BUCKET = 2
+_OPEN_AUTO = 3
+
+def _unlink_path(s):
+    '''Return the list of states on the path to s, from the initial
+       state to s, as shallow copies with their parent links removed
+       (None if s is None).'''
+    if s is None:
+        return None
+    path = []
+    while s:
+        c = copy.copy(s)
+        c.parent = None
+        path.append(c)
+        s = s.parent
+    path.reverse()
+    return path
+
+def _relink_path(path):
+    '''Inverse of _unlink_path: restore the parent links along path and
+       return its last state'''
+    if path is None:
+        return None
+    for i in range(1, len(path)):
+        path[i].parent = path[i-1]
+    return path[-1]
+
+class SearchResult:
+    '''The outcome of a quiet search (SearchEngine.search called with
+       quiet=True).
+         goal               the goal state found, or None if the search failed
+         cost               the gval of the goal state (None if no goal)
+         actions            the list of actions leading from the initial
+                            state to goal, as text (see
+                            StateSpace.action_name; computed when first
+                            accessed)
+         strategy           a description of the search strategy used
+         wall_time          elapsed time of the search, in seconds
+         cpu_time           processor time used by the search, in seconds
+         nodes_expanded     the number of search nodes created
+         states_generated   the number of states generated
+         cycle_check_pruned the number of states pruned by cycle checking
+         max_open           the peak size of OPEN (for 'ida_star', the
+                            depth of the deepest path explored)
+         exhausted          None, or the budget that stopped the search
+                            before it finished: 'node_limit', 'time_limit'
+                            or 'memory_limit'
+         best               if the search was stopped by a budget, the
+                            state with the lowest hval on the frontier
+                            (for 'ida_star', the lowest hval generated)
+         best_hval          the hval of best
+         bound              for 'anytime_astar', the suboptimality bound of
+                            goal: its cost is at most bound times optimal
+         solutions          for 'anytime_astar', the list of (cost, bound,
+                            wall_time) triples of every solution found
+         heuristic_hits     if the heuristic cache is on (see
+         heuristic_misses   SearchEngine.set_heuristic_cache), the number
+                            of hvals found in and missing from the cache
+         heuristic_calls    if lazy heuristic evaluation is on (see
+         heuristic_saved    SearchEngine.set_lazy_heuristic), the number
+                            of calls to the heuristic, and the number of
+                            nodes put on OPEN whose heuristic was never
+                            computed
+       A SearchResult is true iff the search found a goal. SearchResults
+       can be pickled (e.g., to return them from worker processes): the
+       goal and best states are stored as flat lists of the states on
+       their paths rather than as long chains of parent links.'''
+
+    def __init__(self, goal, strategy, wall_time, cpu_time, nodes_expanded,
+                 states_generated, cycle_check_pruned, max_open,
+                 exhausted = None, best_node = None):
+        self.goal = goal
+        self.cost = goal.gval if goal else None
+        self.strategy = strategy
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.nodes_expanded = nodes_expanded
+        self.states_generated = states_generated
+        self.cycle_check_pruned = cycle_check_pruned
+        self.max_open = max_open
+        self.exhausted = exhausted
+        self.best = best_node.state if best_node else None
+        self.best_hval = best_node.hval if best_node else None
+        self.bound = None
+        self.solutions = None
+        self.heuristic_hits = None
+        self.heuristic_misses = None
+        self.heuristic_calls = None
+        self.heuristic_saved = None
+        self._actions = None
+
+    @property
+    def actions(self):
+        if self._actions is None and self.goal:
+            actions = []
+            s = self.goal
+            while s.parent:
+                actions.append(s.action_name())
+                s = s.parent
+            actions.reverse()
+            self._actions = actions
+        return self._actions
+
+    def __bool__(self):
+        return self.goal is not None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['goal'] = _unlink_path(self.goal)
+        state['best'] = _unlink_path(self.best)
+        return state
+
+    def __setstate__(self, state):
+        state['goal'] = _relink_path(state['goal'])
+        state['best'] = _relink_path(state['best'])
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return "SearchResult(cost={}, strategy='{}', wall_time={:.6f}, nodes_expanded={}, states_generated={}, cycle_check_pruned={}, max_open={}, exhausted={})".format(self.cost, self.strategy, self.wall_time, self.nodes_expanded, self.states_generated, self.cycle_check_pruned, self.max_open, self.exhausted)
+
 class SearchEngine:
     def __init__(self, strategy = 'depth_first', cc_level = 'default'):
         self.set_strategy(strategy, cc_level)
         self.trace = 0
+        self.general_loop = False   #use searchOpenTraced without tracing too (to benchmark the specialized loops)
+        self.quiet = False
+        self.open_type = _OPEN_HEAP
+        self.init_budget()
+        self.set_anytime()
+        self.set_external()
+        self.set_frontier()
+        self.set_beam()
+        self.set_heuristic_cache(0)
+        self.set_lazy_heuristic(False)
+        self.set_bidirectional()
+        self.set_checkpoint(None)
+        self.set_realtime()
+        self.set_telemetry(None)
 
     def initStats(self):
-        sNode.n = 0
-        StateSpace.n = 1    #initial state already generated on call so search
+        self.nodes_expanded = 0      #search nodes created (numbers them)
+        self.states_generated = 1    #initial state already generated on call so search
         self.total_search_time = 0
         self.cycle_check_pruned = 0
+        self.max_open = 0
+        self.checkpoints = 0
+        self.checkpoint_time = 0     #seconds spent writing checkpoints
+        self.heuristic_calls = None  #counted by lazy searches only
+        self.heuristic_saved = None
         self.total_search_time = os.times()[0]
+        self.start_wall_time = time.perf_counter()
+        self.start_cpu_time = time.process_time()
+
+    def init_budget(self, node_limit = None, time_limit = None, memory_limit = None):
+        '''Set the budgets for the next search (None for no limit) and
+           return True if any budget is set.'''
+        self.node_limit = node_limit
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.memory_limit = memory_limit
+        self.budget_countdown = 0
+        self.exhausted = None
+        self.best_node = None
+        self.checkpoint_due = None
+        self.telemetry_due = None
+        self.budgeted = node_limit is not None or time_limit is not None or memory_limit is not None
+        return self.budgeted
+
+    def over_budget(self, nodes_expanded):
+        '''Return True (and record which budget ran out in self.exhausted)
+           if the search, which has expanded nodes_expanded nodes so far,
+           has used up one of its budgets.'''
+        if self.node_limit is not None and nodes_expanded >= self.node_limit:
+            self.exhausted = 'node_limit'
+            return True
+        if self.checkpoint_due is not None and nodes_expanded >= self.checkpoint_due:
+            #not a budget: searchOpen writes a checkpoint and carries on
+            self.exhausted = 'checkpoint'
+            return True
+        if self.telemetry_due is not None and nodes_expanded >= self.telemetry_due:
+            #not a budget either: searchOpen records a sample
+            self.exhausted = 'telemetry'
+            return True
+        self.budget_countdown = self.budget_countdown - 1
+        if self.budget_countdown > 0:
+            return False
+        self.budget_countdown = _BUDGET_CHECK_INTERVAL
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.exhausted = 'time_limit'
+            return True
+        if self.memory_limit is not None and _rss_bytes() >= self.memory_limit:
+            self.exhausted = 'memory_limit'
+            return True
+        return False
+
+    def next_budget_check(self, nodes_expanded):
+        '''Return the number of nodes expanded at which the searchOpen
+           loops, now at nodes_expanded, next call check_budget: the
+           first of the node limit, the next checkpoint, the next
+           telemetry sample and, with a time or memory limit,
+           _BUDGET_CHECK_INTERVAL nodes from now (_NO_CHECK if none is
+           set). In between, the loops only compare their node count
+           with this number.'''
+        due = _NO_CHECK
+        for d in (self.node_limit, self.checkpoint_due, self.telemetry_due):
+            if d is not None and d < due:
+                due = d
+        if self.deadline is not None or self.memory_limit is not None:
+            due = min(due, nodes_expanded + _BUDGET_CHECK_INTERVAL)
+        return due
+
+    def check_budget(self, nodes_expanded):
+        '''over_budget with the time and memory limits checked on every
+           call: for the searchOpen loops, which only call it when
+           next_budget_check says a check is due, and for the moves of
+           searchRealtime.'''
+        self.budget_countdown = 0
+        return self.over_budget(nodes_expanded)
 
     def trace_on(self, level = 1):
         '''For debugging, set tracking level 1 or 2'''
@@ -244,34 +1084,262 @@ class SearchEngine:
         '''Turn off tracing'''
         self.trace = 0
 
+    def set_open_type(self, ot = 'heap'):
+        '''Select the OPEN set used by best first and astar search:
+           'heap' (a heap of nodes, possibly holding several nodes for
+           the same state), 'indexed' (an IndexedOpen, holding at most
+           one node per state), 'bucket' (a BucketOpen, for small
+           integer costs and heuristic values) or 'auto' (a BucketOpen
+           if the initial state's gval and hval are small integers, a
+           heap otherwise). Other strategies ignore this setting.'''
+        if not ot in ['heap', 'indexed', 'bucket', 'auto']:
+            print('Unknown OPEN type specified:', ot)
+            print("Must be one of 'heap', 'indexed', 'bucket' or 'auto'")
+        elif ot == 'heap': self.open_type = _OPEN_HEAP
+        elif ot == 'indexed': self.open_type = _OPEN_INDEXED
+        elif ot == 'bucket': self.open_type = _OPEN_BUCKET
+        elif ot == 'auto': self.open_type = _OPEN_AUTO
+
+    def set_anytime(self, weight = 2.5, decrement = 0.5, solution_fn = None):
+        '''Configure the 'anytime_astar' strategy. The first solution is
+           found with the heuristic multiplied by weight, and the weight
+           is lowered by decrement after each solution until it reaches 1.
+           If solution_fn is given it is called as
+           solution_fn(goal_state, cost, bound) on every solution found.'''
+        self.anytime_weight = weight
+        self.anytime_decrement = decrement
+        self.anytime_solution_fn = solution_fn
+
+    def set_external(self, directory = None, run_size = 100000, locality = None):
+        '''Configure the 'external_astar' strategy. Its run files are
+           kept in a new temporary directory inside directory (by default
+           the system's temporary directory), which is removed when the
+           search ends. At most run_size new nodes are held in memory
+           before they are written to disk. A node is checked against
+           the expanded states whose gval is at least its gval minus
+           locality (None to check against every expanded state). For
+           state spaces with unit cost actions where undoing an action
+           gives back the same hashable_state a locality of 2 finds
+           every duplicate, as in rushhour.'''
+        self.external_directory = directory
+        self.external_run_size = run_size
+        self.external_locality = locality
+
+    def set_frontier(self, layers = 1):
+        '''Configure the 'frontier_bfs' strategy: a successor is checked
+           for duplicates against its own layer, the layer being
+           expanded and that many layers before it (None to keep the
+           keys of every layer for checking). One layer is enough when
+           undoing an action gives back the same hashable_state.
+           Otherwise states of older layers can be reached again, which
+           costs time and stops the search from ending when there is no
+           solution: WaterJugs (whose actions can't all be undone) needs
+           layers = None for that; one layer is enough for rushhour.'''
+        self.frontier_layers = layers
+
+    def set_beam(self, width = 100, order = 'h'):
+        '''Configure the 'beam' strategy: keep the width best nodes of
+           each depth, ordered by hval (order 'h') or by gval+hval
+           (order 'f'), breaking ties in favour of the node generated
+           first.'''
+        if not order in ['h', 'f']:
+            print('Unknown beam order specified:', order)
+            print("Must be one of 'h' or 'f'")
+        else:
+            self.beam_width = width
+            self.beam_order = order
+
+    def set_heuristic_cache(self, maxsize = 100000):
+        '''Cache up to maxsize hvals per search, keyed by hashable_state()
+           (see class HeuristicCache). A maxsize of 0 turns caching off.'''
+        self.heur_cache_size = maxsize
+
+    def set_lazy_heuristic(self, lazy = True):
+        '''Turn lazy (deferred) heuristic evaluation on or off for best
+           first and astar search. When it is on, successors go on OPEN
+           with their parent's fval (astar) or hval (best first) and
+           heur_fn is only called for a node when it is extracted from
+           OPEN; if its own value is worse the node goes back on OPEN.
+           This saves the heuristic calls for nodes that are never
+           extracted, at the cost of some extra OPEN operations, so it
+           pays off for expensive heuristics. With an admissible and
+           consistent heuristic astar remains optimal. Not used when
+           tracing.'''
+        self.lazy_heuristic = lazy
+
+    def set_bidirectional(self, goal_states = None, heur_back_fn = None):
+        '''Configure the 'bidirectional' strategy: goal_states is a goal
+           state or a list of goal states (StateSpace objects whose gval
+           is 0) to start the backward search from, and heur_back_fn (if
+           not None) a heuristic for the backward search estimating the
+           cost to reach a state from the initial state. The forward
+           search uses search's heur_fn, and search's goal_fn is not used.
+           With admissible heuristics the solution found is optimal.'''
+        if goal_states is not None and not isinstance(goal_states, list):
+            goal_states = [goal_states]
+        self.bidirectional_goals = goal_states
+        self.bidirectional_heur_fn = heur_back_fn
+
+    def set_checkpoint(self, path, interval = 100000, encode = None, decode = None):
+        '''Save the state of 'depth_first', 'breadth_first', 'best_first'
+           and 'astar' searches to the file path (None for no
+           checkpoints) every interval nodes or more (see below), so
+           that they can be continued with resume if the process is
+           stopped. A checkpoint holds the nodes on OPEN, the states on
+           their paths, the cycle check dictionary and the search
+           statistics; it is written to a temporary file that then
+           replaces path, so path always holds a complete checkpoint.
+
+           Each checkpoint is written in full, which takes time in
+           proportion to the nodes on OPEN (with the states on their
+           paths) and the cycle check dictionary: about 3.4 microseconds
+           per node on OPEN for astar on rushhour, e.g., 1.4 seconds
+           for the 22 MB checkpoint with 420,000 nodes on OPEN, about
+           40% of the time the search took to get there. Writing one
+           every 100,000 nodes would double the time of that search. So
+           after a checkpoint that took w seconds the next one is put
+           off, if needed, until the search has run for
+           w / _CHECKPOINT_SHARE (20 w) more seconds: checkpoints then
+           grow further apart as they grow larger. On the rushhour test8
+           board (530,000 nodes, 3.4 seconds) this writes one checkpoint
+           taking 0.19 seconds with the default interval, and two taking
+           0.5 seconds with an interval of 20,000. After a crash the
+           search loses at most the work since the last checkpoint.
+
+           States are saved as encode(state), which returns a compact
+           picklable representation of the problem specific data of
+           state, and are rebuilt by decode(data, root), where root is
+           the initial state of the search (saved in full), whose action,
+           gval and parent are then set. By default states are pickled
+           whole.'''
+        self.checkpoint_path = path
+        self.checkpoint_interval = interval
+        self.checkpoint_encode = encode
+        self.checkpoint_decode = decode
+
+    def set_realtime(self, move_nodes = 1000, move_time = None, trials = 1, learned = None):
+        '''Configure the real-time agent of the 'lrta_star' strategy and
+           realtime_move. Before each move it runs a lookahead search
+           that stops after creating move_nodes nodes or after move_time
+           seconds (None for no limit), so the time a move takes is
+           bounded whatever the problem; the bound is exceeded by at most
+           the time to expand one state. A search runs up to trials
+           trials, stopping early when the learned hvals no longer change.
+           The learned hvals are kept in the dictionary learned (by
+           default a new one), which maps the problem of the states (see
+           StateSpace.problem) to a dictionary of their hvals keyed by
+           hashable_state(), for as long as this configuration is in
+           use. When no goal can be reached the agent only finds out
+           once a lookahead has expanded every state it can reach, so on
+           large problems without a solution give the search a budget.'''
+        self.realtime_move_nodes = move_nodes
+        self.realtime_move_time = move_time
+        self.realtime_trials = trials
+        self.realtime_h = dict() if learned is None else learned
+
+    def set_telemetry(self, output, interval = 10000):
+        '''Record a sample of the progress of 'depth_first',
+           'breadth_first', 'best_first' and 'astar' searches each time
+           at least interval more nodes have been expanded, and once more
+           when the search ends. output is
+           the path of a file to which each sample is appended as a line
+           of JSON, or a function that is called with each sample (None
+           for no samples). A sample is a dictionary with the items
+              time             seconds since the search started
+              nodes            nodes expanded so far
+              states_generated states generated so far
+              nodes_per_sec    nodes expanded per second since the
+                               previous sample
+              open             number of nodes on OPEN
+              cc_dictionary    number of states in the cycle check
+                               dictionary (None without full cycle
+                               checking)
+              bound            fval (astar), hval (best first) or gval
+                               (breadth first) of the next node on OPEN
+              heuristic_calls  calls to the heuristic so far
+              heuristic_time   estimated seconds spent in those calls:
+                               their number times the time of a call
+                               on the next node on OPEN, timed when the
+                               sample is taken (0.0 for no heuristic)
+              rss              resident set size of the process (bytes)
+           Samples are taken at the same points as the budget checks,
+           which the search loops count down to, so the search itself
+           runs exactly as it does without telemetry.'''
+        self.telemetry_output = output
+        self.telemetry_interval = interval
+
     def set_strategy(self, s, cc = 'default'):
-        if not s in ['depth_first', 'breadth_first', 'best_first', 'astar']:
+        if not s in ['depth_first', 'breadth_first', 'best_first', 'astar', 'ida_star', 'anytime_astar', 'external_astar', 'frontier_bfs', 'beam', 'pea_star', 'bidirectional', 'lrta_star']:
             print('Unknown search strategy specified:', s)
-            print("Must be one of 'depth_first', 'breadth_first', 'best_first', or 'astar'")
+            print("Must be one of 'depth_first', 'breadth_first', 'best_first', 'astar', 'ida_star', 'anytime_astar', 'external_astar', 'frontier_bfs', 'beam', 'pea_star', 'bidirectional' or 'lrta_star'")
         elif not cc in ['default', 'none', 'path', 'full']:
             print('Unknown cycle check level', cc)
             print( "Must be one of ['default', 'none', 'path', 'full']")
 
         else:
             if cc == 'default' :
-                if s == 'depth_first' :
+                if s == 'depth_first' or s == 'ida_star':
                     self.cycle_check = _CC_PATH
                 else:
                     self.cycle_check = _CC_FULL
+            elif s == 'anytime_astar' and cc in ['none', 'path']:
+                #ARA* relies on the g-values kept in the cycle check
+                #dictionary to reuse its search effort.
+                print("'anytime_astar' always uses full cycle checking")
+                self.cycle_check = _CC_FULL
+            elif s == 'external_astar' and cc in ['none', 'path']:
+                #duplicates are always removed, when a bucket is expanded
+                print("'external_astar' always uses full (delayed) cycle checking")
+                self.cycle_check = _CC_FULL
+            elif s == 'frontier_bfs' and cc in ['none', 'path']:
+                #duplicates are always removed, within the layers kept
+                print("'frontier_bfs' always checks for cycles against its recent layers")
+                self.cycle_check = _CC_FULL
+            elif s == 'bidirectional' and cc in ['none', 'path']:
+                #the searches meet in the states both have reached
+                print("'bidirectional' always uses full cycle checking")
+                self.cycle_check = _CC_FULL
+            elif s == 'lrta_star' and cc in ['none', 'path']:
+                #the lookahead searches are small and always check fully
+                print("'lrta_star' always uses full cycle checking in its lookahead searches")
+                self.cycle_check = _CC_FULL
             elif cc == 'none': self.cycle_check = _CC_NONE
             elif cc == 'path': self.cycle_check = _CC_PATH
-            elif cc == 'full': self.cycle_check = _CC_FULL
+            elif cc == 'full':
+                if s == 'ida_star':
+                    #full cycle checking would remember every state ever
+                    #reached, defeating the linear memory bound of IDA*.
+                    print("Full cycle checking not available with 'ida_star', using path checking")
+                    self.cycle_check = _CC_PATH
+                else:
+                    self.cycle_check = _CC_FULL
 
             if   s == 'depth_first'  : self.strategy = _DEPTH_FIRST
             elif s == 'breadth_first': self.strategy = _BREADTH_FIRST
             elif s == 'best_first'   : self.strategy = _BEST_FIRST
             elif s == 'astar'        : self.strategy = _ASTAR
+            elif s == 'ida_star'     : self.strategy = _IDA_STAR
+            elif s == 'anytime_astar': self.strategy = _ANYTIME_ASTAR
+            elif s == 'external_astar': self.strategy = _EXTERNAL_ASTAR
+            elif s == 'frontier_bfs' : self.strategy = _FRONTIER_BFS
+            elif s == 'beam'         : self.strategy = _BEAM
+            elif s == 'pea_star'     : self.strategy = _PEA_STAR
+            elif s == 'bidirectional': self.strategy = _BIDIRECTIONAL
+            elif s == 'lrta_star'    : self.strategy = _LRTA_STAR
 
     def get_strategy(self):
         if   self.strategy == _DEPTH_FIRST    : rval = 'depth_first'
         elif self.strategy == _BREADTH_FIRST  : rval = 'breadth_first'
         elif self.strategy == _BEST_FIRST     : rval = 'best_first'
         elif self.strategy == _ASTAR          : rval = 'astar'
+        elif self.strategy == _IDA_STAR       : rval = 'ida_star'
+        elif self.strategy == _ANYTIME_ASTAR  : rval = 'anytime_astar'
+        elif self.strategy == _EXTERNAL_ASTAR : rval = 'external_astar'
+        elif self.strategy == _FRONTIER_BFS   : rval = 'frontier_bfs'
+        elif self.strategy == _BEAM           : rval = 'beam (width {}, by {})'.format(self.beam_width, self.beam_order)
+        elif self.strategy == _PEA_STAR       : rval = 'pea_star'
+        elif self.strategy == _BIDIRECTIONAL  : rval = 'bidirectional'
+        elif self.strategy == _LRTA_STAR      : rval = 'lrta_star'
 
         rval = rval + ' with '
 
@@ -281,7 +1349,19 @@ class SearchEngine:
 
         return rval
 
-    def search(self, initState, goal_fn, heur_fn = _zero_hfn):
+    def search(self, initState, goal_fn, heur_fn = _zero_hfn, quiet = False,
+               node_limit = None, time_limit = None, memory_limit = None):
+        '''Search for a path from initState to a state satisfying goal_fn.
+           By default the outcome is printed, and the goal state (or False
+           if the search failed) is returned. With quiet=True nothing is
+           printed (apart from any trace output) and a SearchResult is
+           returned.
+
+           The search can be given budgets: node_limit (nodes expanded),
+           time_limit (seconds) and memory_limit (resident set size of
+           the process, in bytes). When a budget runs out the search stops
+           and reports a partial result: the statistics so far, and the
+           frontier node with the lowest hval.'''
         #Perform full cycle checking as follows
         #a. check state before inserting into OPEN. If we had already reached
         #   the same state via a cheaper path, don't insert into OPEN.
@@ -294,6 +1374,11 @@ class SearchEngine:
 
     ###INIT the Search
         self.initStats()
+        self.lazy = (self.lazy_heuristic and not self.trace and
+                     self.strategy in [_BEST_FIRST, _ASTAR])
+        self.heur_cache = None
+        if self.heur_cache_size:
+            heur_fn = self.heur_cache = HeuristicCache(heur_fn, self.heur_cache_size)
 
         #BEGIN TRACING
         if self.trace:
@@ -302,23 +1387,324 @@ class SearchEngine:
             initState.print_state()
         #END TRACING
 
-        OPEN = Open(self.strategy)
-
-        node = sNode(initState, heur_fn(initState))
+        self.quiet = quiet
+        if self.strategy == _IDA_STAR:
+            #IDA* keeps no OPEN set or cycle check dictionary.
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchIDA(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        if self.strategy == _ANYTIME_ASTAR:
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchAnytime(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        if self.strategy == _EXTERNAL_ASTAR:
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchExternal(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        if self.strategy == _FRONTIER_BFS:
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchFrontier(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        if self.strategy == _BEAM:
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchBeam(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        if self.strategy == _PEA_STAR:
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchPartial(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        if self.strategy == _BIDIRECTIONAL:
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchBidirectional(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        if self.strategy == _LRTA_STAR:
+            self.init_budget(node_limit, time_limit, memory_limit)
+            goal_node = self.searchRealtime(initState, goal_fn, heur_fn)
+            if quiet:
+                return self.result(goal_node)
+            return self.report(goal_node)
+
+        node = sNode(initState, heur_fn(initState), 0)
+        self.nodes_expanded = 1
+        if self.lazy:
+            #the initial state's call, by search
+            self.heuristic_calls = 1
+            self.heuristic_saved = 0
+
+        OPEN = self.make_open(node)
 
         #the cycle check dictionary stores the cheapest path (g-val) found
         #so far to a state.
         if self.cycle_check == _CC_FULL:
             self.cc_dictionary = dict()
-            self.cc_dictionary[initState.hashable_state()] = initState.gval
+            self.cc_dictionary[initState.key()] = initState.gval
         OPEN.insert(node)
 
     ###NOW do the search and return the result
-        goal_node = self.searchOpen(OPEN, goal_fn, heur_fn)
+        goal_node = self.searchOpen(OPEN, goal_fn, heur_fn, node_limit, time_limit, memory_limit)
+        if quiet:
+            return self.result(goal_node)
+        return self.report(goal_node)
+
+    def write_checkpoint(self, OPEN):
+        '''Save the search, whose frontier is OPEN, to the checkpoint
+           file (see set_checkpoint). Each state on the paths to the
+           nodes on OPEN is saved once, after its parent, and the nodes
+           refer to their states by position (the initial state is at
+           position 0). States and nodes are saved as columns, lists of
+           (data, parent position, action, gval) and of (position, hval,
+           index, pending) respectively, which are quicker to build and
+           to pickle than a tuple per state or node.'''
+        encode = self.checkpoint_encode
+        positions = dict()      #id(state) -> position in the state columns
+        get = positions.get
+        datas = []
+        parents = []
+        actions = []
+        gvals = []
+        states = []
+        root = None
+        nodes = OPEN.nodes()
+        for node in nodes:
+            s = node.state
+            i = get(id(s))
+            if i is None:
+                chain = []
+                while s is not None and id(s) not in positions:
+                    chain.append(s)
+                    s = s.parent
+                for s in reversed(chain):
+                    parent = s.parent
+                    if parent is None:
+                        root = s
+                        datas.append(None)
+                        parents.append(-1)
+                    else:
+                        datas.append(encode(s) if encode else _dumps_state(s))
+                        parents.append(positions[id(parent)])
+                    actions.append(s.action)
+                    gvals.append(s.gval)
+                    i = positions[id(s)] = len(gvals) - 1
+            states.append(i)
+        pending = _PendingNode
+        checkpoint = {
+            'strategy': self.strategy, 'cycle_check': self.cycle_check,
+            'open_type': self.open_type, 'lazy': self.lazy,
+            'root': _dumps_state(root) if root else None,
+            'states': (datas, parents, actions, gvals),
+            'open': (states, [node.hval for node in nodes], [node.index for node in nodes],
+                     [type(node) is pending for node in nodes]),
+            'cc_dictionary': self.cc_dictionary if self.cycle_check == _CC_FULL else None,
+            'stats': (self.nodes_expanded, self.states_generated, self.cycle_check_pruned, self.max_open,
+                      self.heuristic_calls, self.heuristic_saved,
+                      time.perf_counter() - self.start_wall_time, time.process_time() - self.start_cpu_time),
+            }
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_path))
+        (fd, tmp) = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.checkpoint_path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.checkpoints = self.checkpoints + 1
+
+    def next_checkpoint(self, write_time):
+        '''Return the number of nodes expanded at which the next
+           checkpoint is due: checkpoint_interval nodes from now, or
+           later if the search, at the rate it has expanded nodes since
+           the previous checkpoint, would take less than write_time /
+           _CHECKPOINT_SHARE seconds to get there, where write_time is
+           the time the checkpoint just written took.'''
+        now = time.perf_counter()
+        (last_time, last_nodes) = self.checkpoint_last
+        nodes = self.nodes_expanded
+        due = nodes + self.checkpoint_interval
+        searched = now - write_time - last_time
+        if searched > 0:
+            rate = (nodes - last_nodes) / searched
+            due = max(due, nodes + int(rate * write_time / _CHECKPOINT_SHARE))
+        self.checkpoint_last = (now, nodes)
+        return due
+
+    def resume(self, path, goal_fn, heur_fn = _zero_hfn, quiet = False,
+               node_limit = None, time_limit = None, memory_limit = None):
+        '''Continue the search saved in the checkpoint file path (see
+           set_checkpoint; the same decode function must be set). The
+           strategy, cycle check level, OPEN type and lazy heuristic
+           setting of the saved search are restored, and the search goes
+           on as search would, with its statistics and timings counting
+           from the start of the saved search. Checkpoints continue to be
+           written if set_checkpoint has been given a path.'''
+        with open(path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        self.strategy = checkpoint['strategy']
+        self.cycle_check = checkpoint['cycle_check']
+        self.open_type = checkpoint['open_type']
+        self.lazy_heuristic = checkpoint['lazy']
+
+        self.initStats()
+        self.lazy = (self.lazy_heuristic and not self.trace and
+                     self.strategy in [_BEST_FIRST, _ASTAR])
+        self.heur_cache = None
+        if self.heur_cache_size:
+            heur_fn = self.heur_cache = HeuristicCache(heur_fn, self.heur_cache_size)
+        (self.nodes_expanded, self.states_generated, self.cycle_check_pruned, self.max_open,
+         self.heuristic_calls, self.heuristic_saved, wall_time, cpu_time) = checkpoint['stats']
+        self.start_wall_time = self.start_wall_time - wall_time
+        self.start_cpu_time = self.start_cpu_time - cpu_time
+        self.quiet = quiet
+
+        decode = self.checkpoint_decode
+        root = pickle.loads(checkpoint['root']) if checkpoint['root'] else None
+        states = []
+        for (data, parent, action, gval) in zip(*checkpoint['states']):
+            if parent < 0:
+                s = root
+            else:
+                s = decode(data, root) if decode else pickle.loads(data)
+                s.parent = states[parent]
+            s.action = action
+            s.gval = gval
+            states.append(s)
+        nodes = [(_PendingNode if pending else sNode)(states[i], hval, index)
+                 for (i, hval, index, pending) in zip(*checkpoint['open'])]
+        if self.cycle_check == _CC_FULL:
+            self.cc_dictionary = checkpoint['cc_dictionary']
+        del checkpoint, states
+
+        goal_node = False
+        if nodes:
+            OPEN = self.make_open(nodes[0])
+            for node in nodes:
+                OPEN.insert(node)
+            del nodes
+            goal_node = self.searchOpen(OPEN, goal_fn, heur_fn, node_limit, time_limit, memory_limit)
+        if quiet:
+            return self.result(goal_node)
+        return self.report(goal_node)
+
+    def telemetry_heur_time(self, OPEN, calls):
+        '''Estimate the seconds spent in the heuristic by calls to it,
+           by timing it on the state of the next node on OPEN (see
+           set_telemetry).'''
+        heur_fn = self.telemetry_heur
+        node = OPEN.first()
+        if heur_fn is _zero_hfn or node is None:
+            return 0.0
+        if self.heur_cache:
+            #only the misses reach the heuristic, and hits would
+            #spoil the timing
+            heur_fn = heur_fn.heur_fn
+            calls = self.heur_cache.misses
+        state = node.state
+        start = time.perf_counter()
+        for i in range(_TELEMETRY_HEURISTIC_CALLS):
+            heur_fn(state)
+        return calls * (time.perf_counter() - start) / _TELEMETRY_HEURISTIC_CALLS
+
+    def telemetry_sample(self, OPEN):
+        '''Record a telemetry sample of the search, whose frontier is
+           OPEN (see set_telemetry).'''
+        #every node created has its heuristic evaluated, except the
+        #_PendingNodes of a lazy search
+        calls = self.heuristic_calls if self.lazy else self.nodes_expanded
+        heur_time = self.telemetry_heur_time(OPEN, calls)
+        now = time.perf_counter()
+        (last_time, last_nodes) = self.telemetry_last
+        self.telemetry_last = (now, self.nodes_expanded)
+        sample = {
+            'time': now - self.start_wall_time,
+            'nodes': self.nodes_expanded,
+            'states_generated': self.states_generated,
+            'nodes_per_sec': (self.nodes_expanded - last_nodes) / (now - last_time) if now > last_time else None,
+            'open': len(OPEN),
+            'cc_dictionary': len(self.cc_dictionary) if self.cycle_check == _CC_FULL else None,
+            'bound': OPEN.bound(),
+            'heuristic_calls': calls,
+            'heuristic_time': heur_time,
+            'rss': _rss_bytes(),
+            }
+        output = self.telemetry_output
+        if callable(output):
+            output(sample)
+        else:
+            with open(output, 'a') as f:
+                f.write(json.dumps(sample) + '\n')
+
+    def make_open(self, node):
+        '''Return an empty OPEN set for the current strategy and OPEN
+           type. node is the initial search node.'''
+        #partial expansion A* orders OPEN as astar does
+        strategy = _ASTAR if self.strategy == _PEA_STAR else self.strategy
+        if strategy in [_BEST_FIRST, _ASTAR]:
+            if self.open_type == _OPEN_INDEXED:
+                return IndexedOpen(strategy)
+            if self.open_type == _OPEN_BUCKET:
+                return BucketOpen(strategy)
+            if (self.open_type == _OPEN_AUTO and
+                isinstance(node.gval, int) and isinstance(node.hval, int) and
+                0 <= node.gval + node.hval <= _BUCKET_LIMIT):
+                return BucketOpen(strategy)
+        return Open(strategy)
+
+    def result(self, goal_node):
+        '''Return a SearchResult describing the outcome of a search'''
+        result = SearchResult(goal_node.state if goal_node else None,
+                              self.get_strategy(),
+                              time.perf_counter() - self.start_wall_time,
+                              time.process_time() - self.start_cpu_time,
+                              self.nodes_expanded, self.states_generated, self.cycle_check_pruned,
+                              self.max_open, self.exhausted, self.best_node)
+        if self.strategy == _ANYTIME_ASTAR:
+            result.solutions = self.solutions
+            if self.solutions:
+                result.bound = self.solutions[-1][1]
+        if self.heur_cache:
+            result.heuristic_hits = self.heur_cache.hits
+            result.heuristic_misses = self.heur_cache.misses
+        if self.lazy:
+            result.heuristic_calls = self.heuristic_calls
+            result.heuristic_saved = self.heuristic_saved
+        return result
+
+    def report(self, goal_node):
+        '''Print the outcome of a search, and return the goal state
+           (or False if the search failed)'''
         if goal_node:
             print("Search Successful!")
             print("   Strategy = '{}'".format(self.get_strategy()))
             print("   Solution cost = {}".format(goal_node.gval))
+            if self.strategy == _ANYTIME_ASTAR:
+                print("   Suboptimality bound = {:.3f}".format(self.solutions[-1][1]))
+                if self.exhausted:
+                    print("   (search stopped early, {} reached)".format(self.exhausted))
+            if self.strategy == _BEAM:
+                print("   (beam search: the solution may not be optimal)")
+            if self.strategy == _LRTA_STAR:
+                print("   (real-time search: the solution is the route the agent took)")
             print("   Goal state: ", end="")
             goal_node.state.print_state()
             print("----------------------------")
@@ -326,18 +1712,438 @@ class SearchEngine:
             goal_node.state.print_path()
             self.total_search_time = os.times()[0] - self.total_search_time
             print("----------------------------")
-            print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.total_search_time,sNode.n, StateSpace.n, self.cycle_check_pruned))
+            print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.total_search_time, self.nodes_expanded, self.states_generated, self.cycle_check_pruned))
+            if self.heur_cache:
+                print("Heuristic cache hits = {}, misses = {}".format(self.heur_cache.hits, self.heur_cache.misses))
+            if self.lazy:
+                print("Heuristic calls = {}, calls saved by lazy evaluation = {}".format(self.heuristic_calls, self.heuristic_saved))
             return goal_node.state
+        elif self.exhausted:
+        #a budget ran out before the search finished
+            print("Search Stopped! (strategy '{}') {} reached".format(self.get_strategy(), self.exhausted))
+            if self.best_node:
+                print("   Best frontier state (h = {}): ".format(self.best_node.hval), end="")
+                self.best_node.state.print_state()
+            self.total_search_time = os.times()[0] - self.total_search_time
+            print("----------------------------")
+            print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.total_search_time, self.nodes_expanded, self.states_generated, self.cycle_check_pruned))
+            if self.heur_cache:
+                print("Heuristic cache hits = {}, misses = {}".format(self.heur_cache.hits, self.heur_cache.misses))
+            if self.lazy:
+                print("Heuristic calls = {}, calls saved by lazy evaluation = {}".format(self.heuristic_calls, self.heuristic_saved))
+            return False
         else:
         #exited the while without finding goal---search failed
             print("Search Failed! (strategy '{}') No solution found".format(self.get_strategy()))
+            if self.strategy == _BEAM:
+                print("   (beam search is incomplete: a solution may still exist)")
             self.total_search_time = os.times()[0] - self.total_search_time
             print("----------------------------")
-            print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.total_search_time,sNode.n, StateSpace.n, self.cycle_check_pruned))
+            print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.total_search_time, self.nodes_expanded, self.states_generated, self.cycle_check_pruned))
+            if self.heur_cache:
+                print("Heuristic cache hits = {}, misses = {}".format(self.heur_cache.hits, self.heur_cache.misses))
+            if self.lazy:
+                print("Heuristic calls = {}, calls saved by lazy evaluation = {}".format(self.heuristic_calls, self.heuristic_saved))
             return False
 
-    def searchOpen(self, OPEN, goal_fn, heur_fn):
-        '''Open has some nodes on it, now search from that state of OPEN'''
+    def searchOpen(self, OPEN, goal_fn, heur_fn,
+                   node_limit = None, time_limit = None, memory_limit = None):
+        '''Open has some nodes on it, now search from that state of OPEN.
+           The expansion loop is chosen once here: with tracing on (or
+           general_loop set, for eager evaluation) the general loop
+           (searchOpenTraced) is used, otherwise a loop
+           specialized to the cycle check level, with no tracing tests and
+           with attribute lookups hoisted out of the loop. The search
+           strategy itself is already specialized by OPEN's insert and
+           extract functions.
+
+           If a budget runs out (see search) return False with
+           self.exhausted set, and self.best_node set to the node on OPEN
+           with the lowest hval.'''
+
+        self.init_budget(node_limit, time_limit, memory_limit)
+        if self.checkpoint_path is not None:
+            #checkpoints are taken when over_budget says one is due
+            self.checkpoint_due = self.nodes_expanded + self.checkpoint_interval
+            self.checkpoint_last = (time.perf_counter(), self.nodes_expanded)
+            self.budgeted = True
+        if self.telemetry_output is not None:
+            #and so are telemetry samples
+            self.telemetry_heur = heur_fn
+            self.telemetry_last = (self.start_wall_time, 0)
+            self.telemetry_due = self.nodes_expanded + self.telemetry_interval
+            self.budgeted = True
+        self.depth_path = None
+        while True:
+            if self.trace:
+                goal_node = self.searchOpenTraced(OPEN, goal_fn, heur_fn)
+            elif self.lazy:
+                goal_node = self.searchOpenLazy(OPEN, goal_fn, heur_fn)
+            elif self.general_loop:
+                goal_node = self.searchOpenTraced(OPEN, goal_fn, heur_fn)
+            elif self.cycle_check == _CC_FULL:
+                goal_node = self.searchOpenFull(OPEN, goal_fn, heur_fn)
+            elif self.cycle_check == _CC_PATH and self.strategy == _DEPTH_FIRST:
+                goal_node = self.searchOpenDepthPath(OPEN, goal_fn, heur_fn)
+            elif self.cycle_check == _CC_PATH:
+                goal_node = self.searchOpenPath(OPEN, goal_fn, heur_fn)
+            else:
+                goal_node = self.searchOpenNone(OPEN, goal_fn, heur_fn)
+            if self.exhausted == 'checkpoint':
+                start = time.perf_counter()
+                self.write_checkpoint(OPEN)
+                write_time = time.perf_counter() - start
+                self.checkpoint_time = self.checkpoint_time + write_time
+                self.checkpoint_due = self.next_checkpoint(write_time)
+            elif self.exhausted == 'telemetry':
+                self.telemetry_sample(OPEN)
+                self.telemetry_due = self.nodes_expanded + self.telemetry_interval
+            else:
+                break
+            self.exhausted = None
+        if self.telemetry_output is not None:
+            self.telemetry_sample(OPEN)
+        if self.exhausted:
+            #nodes still waiting for their heuristic have no hval of
+            #their own to compare
+            nodes = [nd for nd in OPEN.nodes() if type(nd) is not _PendingNode]
+            if nodes:
+                self.best_node = min(nodes, key=lambda nd: nd.hval)
+        return goal_node
+
+    def searchOpenFull(self, OPEN, goal_fn, heur_fn):
+        '''searchOpen loop for full cycle checking without tracing'''
+        insert = OPEN.insert
+        extract = OPEN.extract
+        open_size = OPEN.__len__
+        new_node = sNode
+        cc_dictionary = self.cc_dictionary
+        cc_get = cc_dictionary.get
+        max_open = self.max_open
+        pruned = self.cycle_check_pruned
+        expanded = self.nodes_expanded
+        generated = self.states_generated
+
+        check_at = self.next_budget_check(expanded)
+
+        size = open_size()
+        while size:
+            if size > max_open:
+                max_open = size
+            if expanded >= check_at:
+                if self.check_budget(expanded):
+                    break
+                check_at = self.next_budget_check(expanded)
+            node = extract()
+            state = node.state
+
+            if goal_fn(state):
+                self.max_open = max_open
+                self.cycle_check_pruned = pruned
+                self.nodes_expanded = expanded
+                self.states_generated = generated
+                return node
+
+            #skip nodes whose state was reached by a cheaper path
+            #after they were inserted into OPEN.
+            if cc_dictionary[state.key()] < node.gval:
+                size = open_size()
+                continue
+
+            successors = state.successors()
+            generated = generated + len(successors)
+            for succ in successors:
+                hash_state = succ.key()
+                gval = succ.gval
+                old_gval = cc_get(hash_state)
+                if old_gval is not None:
+                    if gval > old_gval:
+                        pruned = pruned + 1
+                        continue
+                    #cc_dictionary keeps its own copy of the key; do
+                    #not hold a second one while succ waits on OPEN.
+                    succ._key = None
+                insert(new_node(succ, heur_fn(succ), expanded))
+                expanded = expanded + 1
+                cc_dictionary[hash_state] = gval
+
+            size = open_size()
+
+        self.max_open = max_open
+        self.cycle_check_pruned = pruned
+        self.nodes_expanded = expanded
+        self.states_generated = generated
+        return False
+
+    def searchOpenLazy(self, OPEN, goal_fn, heur_fn):
+        '''searchOpen loop for lazy heuristic evaluation (see
+           set_lazy_heuristic) without tracing, for any cycle check
+           level. Successors go on OPEN as _PendingNodes. heur_fn is
+           called on a _PendingNode when it is extracted (after the
+           cycle check, so stale nodes are dropped unevaluated); if its
+           hval is greater than the stand-in a new node with the real
+           hval goes back on OPEN, otherwise it is expanded at once.
+           Adds the heuristic calls made to self.heuristic_calls and
+           the _PendingNodes left unevaluated to self.heuristic_saved.
+           search sets both up once, so they keep counting when the loop
+           is re-entered after a checkpoint or telemetry sample, and
+           checkpoints save them for resume.'''
+        insert = OPEN.insert
+        extract = OPEN.extract
+        open_size = OPEN.__len__
+        new_node = sNode
+        pending_node = _PendingNode
+        full = self.cycle_check == _CC_FULL
+        path = self.cycle_check == _CC_PATH
+        cc_dictionary = self.cc_dictionary if full else None
+        cc_get = cc_dictionary.get if full else None
+        astar = self.strategy == _ASTAR
+        max_open = self.max_open
+        pruned = self.cycle_check_pruned
+        expanded = self.nodes_expanded
+        generated = self.states_generated
+        calls = self.heuristic_calls
+        saved = self.heuristic_saved
+
+        check_at = self.next_budget_check(expanded)
+
+        goal_node = False
+        size = open_size()
+        while size:
+            if size > max_open:
+                max_open = size
+            if expanded >= check_at:
+                if self.check_budget(expanded):
+                    break
+                check_at = self.next_budget_check(expanded)
+            node = extract()
+            state = node.state
+
+            #skip nodes whose state was reached by a cheaper path
+            #after they were inserted into OPEN.
+            if full and cc_dictionary[state.key()] < node.gval:
+                size = open_size()
+                continue
+
+            if type(node) is pending_node:
+                hval = heur_fn(state)
+                calls = calls + 1
+                saved = saved - 1
+                if hval > node.hval:
+                    insert(new_node(state, hval, node.index))
+                    size = open_size()
+                    continue
+                node = new_node(state, hval, node.index)
+
+            if goal_fn(state):
+                goal_node = node
+                break
+
+            #the stand-in hval of the successors: their parent's fval
+            #for astar, its hval for best first
+            fval = node.gval + node.hval if astar else node.hval
+            successors = state.successors()
+            generated = generated + len(successors)
+            for succ in successors:
+                gval = succ.gval
+                if full:
+                    hash_state = succ.key()
+                    old_gval = cc_get(hash_state)
+                    if old_gval is not None:
+                        if gval > old_gval:
+                            pruned = pruned + 1
+                            continue
+                        succ._key = None
+                    cc_dictionary[hash_state] = gval
+                elif path and succ.has_path_cycle():
+                    pruned = pruned + 1
+                    continue
+                insert(pending_node(succ, fval - gval if astar else fval, expanded))
+                expanded = expanded + 1
+                saved = saved + 1
+
+            size = open_size()
+
+        self.max_open = max_open
+        self.cycle_check_pruned = pruned
+        self.nodes_expanded = expanded
+        self.states_generated = generated
+        self.heuristic_calls = calls
+        self.heuristic_saved = saved
+        return goal_node
+
+    def searchOpenPath(self, OPEN, goal_fn, heur_fn):
+        '''searchOpen loop for path checking without tracing'''
+        insert = OPEN.insert
+        extract = OPEN.extract
+        open_size = OPEN.__len__
+        new_node = sNode
+        max_open = self.max_open
+        pruned = self.cycle_check_pruned
+        expanded = self.nodes_expanded
+        generated = self.states_generated
+
+        check_at = self.next_budget_check(expanded)
+
+        size = open_size()
+        while size:
+            if size > max_open:
+                max_open = size
+            if expanded >= check_at:
+                if self.check_budget(expanded):
+                    break
+                check_at = self.next_budget_check(expanded)
+            node = extract()
+            state = node.state
+
+            if goal_fn(state):
+                self.max_open = max_open
+                self.cycle_check_pruned = pruned
+                self.nodes_expanded = expanded
+                self.states_generated = generated
+                return node
+
+            successors = state.successors()
+            generated = generated + len(successors)
+            for succ in successors:
+                if succ.has_path_cycle():
+                    pruned = pruned + 1
+                    continue
+                insert(new_node(succ, heur_fn(succ), expanded))
+                expanded = expanded + 1
+
+            size = open_size()
+
+        self.max_open = max_open
+        self.cycle_check_pruned = pruned
+        self.nodes_expanded = expanded
+        self.states_generated = generated
+        return False
+
+    def searchOpenDepthPath(self, OPEN, goal_fn, heur_fn):
+        '''searchOpen loop for depth first search with path checking
+           without tracing. Rather than walking each successor's parent
+           chain (StateSpace.has_path_cycle), keep the states on the path
+           to the node being expanded, and the set of their hashable
+           states. Depth first search expands a node right after its
+           parent's subtree up to it, so the path is updated by popping
+           states until the node's parent is on top, then pushing the
+           node. Each check is then a single set lookup, whatever the
+           depth.'''
+        insert = OPEN.insert
+        extract = OPEN.extract
+        open_size = OPEN.__len__
+        new_node = sNode
+        max_open = self.max_open
+        pruned = self.cycle_check_pruned
+        expanded = self.nodes_expanded
+        generated = self.states_generated
+        if self.depth_path is not None:
+            #entered again after a checkpoint or telemetry sample
+            (path, path_keys) = self.depth_path
+        else:
+            path = []       #(state, hashable_state) pairs, root first
+            #when the loop is entered part way through a search (after
+            #resume), start with the path to the parent of the node on
+            #top of the stack: every node on the stack hangs off that path
+            if OPEN.open:
+                s = OPEN.open[-1].state.parent
+                while s is not None:
+                    path.append((s, s.key()))
+                    s = s.parent
+                path.reverse()
+            path_keys = set(key for (s, key) in path)
+
+        check_at = self.next_budget_check(expanded)
+
+        size = open_size()
+        while size:
+            if size > max_open:
+                max_open = size
+            if expanded >= check_at:
+                if self.check_budget(expanded):
+                    break
+                check_at = self.next_budget_check(expanded)
+            node = extract()
+            state = node.state
+
+            if goal_fn(state):
+                self.max_open = max_open
+                self.cycle_check_pruned = pruned
+                self.nodes_expanded = expanded
+                self.states_generated = generated
+                return node
+
+            #backtrack to the parent of state, then descend to state
+            parent = state.parent
+            while path and path[-1][0] is not parent:
+                path_keys.discard(path.pop()[1])
+            key = state.key()
+            path.append((state, key))
+            path_keys.add(key)
+
+            successors = state.successors()
+            generated = generated + len(successors)
+            for succ in successors:
+                if succ.key() in path_keys:
+                    pruned = pruned + 1
+                    continue
+                insert(new_node(succ, heur_fn(succ), expanded))
+                expanded = expanded + 1
+
+            size = open_size()
+
+        self.depth_path = (path, path_keys)
+        self.max_open = max_open
+        self.cycle_check_pruned = pruned
+        self.nodes_expanded = expanded
+        self.states_generated = generated
+        return False
+
+    def searchOpenNone(self, OPEN, goal_fn, heur_fn):
+        '''searchOpen loop without cycle checking or tracing'''
+        insert = OPEN.insert
+        extract = OPEN.extract
+        open_size = OPEN.__len__
+        new_node = sNode
+        max_open = self.max_open
+        expanded = self.nodes_expanded
+        generated = self.states_generated
+
+        check_at = self.next_budget_check(expanded)
+
+        size = open_size()
+        while size:
+            if size > max_open:
+                max_open = size
+            if expanded >= check_at:
+                if self.check_budget(expanded):
+                    break
+                check_at = self.next_budget_check(expanded)
+            node = extract()
+            state = node.state
+
+            if goal_fn(state):
+                self.max_open = max_open
+                self.nodes_expanded = expanded
+                self.states_generated = generated
+                return node
+
+            successors = state.successors()
+            generated = generated + len(successors)
+            for succ in successors:
+                insert(new_node(succ, heur_fn(succ), expanded))
+                expanded = expanded + 1
+
+            size = open_size()
+
+        self.max_open = max_open
+        self.nodes_expanded = expanded
+        self.states_generated = generated
+        return False
+
+    def searchOpenTraced(self, OPEN, goal_fn, heur_fn):
+        '''searchOpen loop handling every cycle check level, with tracing'''
 
         #BEGIN TRACING
         if self.trace:
@@ -347,11 +2153,19 @@ class SearchEngine:
         #END TRACING
 
         while not OPEN.empty():
+            if len(OPEN) > self.max_open:
+                self.max_open = len(OPEN)
+            if self.budgeted and self.over_budget(self.nodes_expanded):
+                #BEGIN TRACING
+                if self.trace:
+                    print("   TRACE: Search stopped, {} reached".format(self.exhausted))
+                #END TRACING
+                return False
             node = OPEN.extract()
 
             #BEGIN TRACING
             if self.trace:
-                print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(node.state.index, node.state.action, node.state.hashable_state(), node.gval, node.hval, node.gval+node.hval))
+                print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(node.state.index, node.state.action_name(), node.state.key(), node.gval, node.hval, node.gval+node.hval))
                 if node.state.gval != node.gval:
                     print("ERROR: Node gval not equal to state gval!")
             #END TRACING
@@ -369,29 +2183,30 @@ class SearchEngine:
 
             #BEGIN TRACING
             if self.trace:
-                if self.cycle_check == _CC_FULL: print("   TRACE: CC_dict gval={}, node.gval={}".format(self.cc_dictionary[node.state.hashable_state()], node.gval))
+                if self.cycle_check == _CC_FULL: print("   TRACE: CC_dict gval={}, node.gval={}".format(self.cc_dictionary[node.state.key()], node.gval))
             #END TRACING
 
-            if self.cycle_check == _CC_FULL and self.cc_dictionary[node.state.hashable_state()] < node.gval:
+            if self.cycle_check == _CC_FULL and self.cc_dictionary[node.state.key()] < node.gval:
                 continue
 
             successors = node.state.successors()
+            self.states_generated = self.states_generated + len(successors)
 
             #BEGIN TRACING
             if self.trace:
                 print("   TRACE: Expanding Node. Successors = {", end="")
                 for ss in successors:
-                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(ss.index, ss.action, ss.hashable_state(), ss.gval, heur_fn(ss), ss.gval+heur_fn(ss)), end="")
+                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(ss.index, ss.action_name(), ss.key(), ss.gval, heur_fn(ss), ss.gval+heur_fn(ss)), end="")
                 print("}")
             #END TRACING
 
             for succ in successors:
-                hash_state = succ.hashable_state()
+                hash_state = succ.key()
 
                 #BEGIN TRACING
                 if self.trace > 1:
                     print("   TRACE: Successor State:", end="")
-                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(succ.index, ss.action, succ.hashable_state(), succ.gval, heur_fn(succ), succ.gval+heur_fn(succ)), end="")
+                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(succ.index, ss.action_name(), succ.key(), succ.gval, heur_fn(succ), succ.gval+heur_fn(succ)), end="")
                     if self.cycle_check == _CC_FULL and hash_state in self.cc_dictionary:
                         print("   TRACE: Already in CC_dict, CC_dict gval={}, successor state gval={}".format(self.cc_dictionary[hash_state], succ.gval))
                     if self.cycle_check == _CC_PATH and succ.has_path_cycle():
@@ -415,7 +2230,8 @@ class SearchEngine:
                     continue
 
                 #passed all cycle checks...add to open
-                OPEN.insert(sNode(succ, heur_fn(succ)))
+                OPEN.insert(sNode(succ, heur_fn(succ), self.nodes_expanded))
+                self.nodes_expanded = self.nodes_expanded + 1
                 #BEGIN TRACING
                 if self.trace > 1:
                     print(" TRACE: Successor State added to OPEN")
@@ -427,3 +2243,833 @@ class SearchEngine:
 
         #end of while--OPEN is empty and no solution
         return False
+
+    def searchIDA(self, initState, goal_fn, heur_fn):
+        '''Iterative deepening A*. Perform a sequence of depth-first
+           searches from initState, each one pruning nodes whose
+           f-value (gval+hval) exceeds the current threshold. The next
+           threshold is the smallest f-value that was pruned by the
+           previous iteration, so the first goal found is optimal when
+           heur_fn is admissible. Only the current path (and the
+           unexplored siblings of each node on it) is kept in memory.'''
+
+        bound = initState.gval + heur_fn(initState)
+        iteration = 0
+        while True:
+            iteration = iteration + 1
+            expanded = self.nodes_expanded
+            generated = self.states_generated
+            pruned = self.cycle_check_pruned
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: IDA* iteration {}, f-bound = {}".format(iteration, bound))
+            #END TRACING
+
+            goal_node, next_bound = self.searchBounded(initState, goal_fn, heur_fn, bound)
+
+            if not self.quiet:
+                print("IDA* iteration {}: f-bound = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(iteration, bound, self.nodes_expanded - expanded, self.states_generated - generated, self.cycle_check_pruned - pruned))
+
+            if goal_node:
+                return goal_node
+            if self.exhausted:
+                return False
+            if next_bound is None:
+                #nothing was pruned by the bound---the whole space has
+                #been searched without finding a goal.
+                return False
+            bound = next_bound
+
+    def searchBounded(self, initState, goal_fn, heur_fn, bound):
+        '''One depth-first iteration of IDA*. Return the pair
+           (goal_node, next_bound), where goal_node is False if no goal
+           was found within bound, and next_bound is the smallest
+           f-value that exceeded bound (None if no node did).'''
+
+        next_bound = None
+        node = sNode(initState, heur_fn(initState), self.nodes_expanded)
+        self.nodes_expanded = self.nodes_expanded + 1
+        if self.budgeted and (self.best_node is None or node.hval < self.best_node.hval):
+            self.best_node = node
+        if node.gval + node.hval > bound:
+            return False, node.gval + node.hval
+        if goal_fn(initState):
+            return node, next_bound
+
+        #The stack holds, for each state on the current path, an
+        #iterator over its not yet explored successors. For path
+        #checking, keys holds the hashable states of the states on the
+        #path and path_keys the same keys as a set, so checking a
+        #successor is a single set lookup.
+        path_check = self.cycle_check == _CC_PATH
+        successors = initState.successors()
+        self.states_generated = self.states_generated + len(successors)
+        stack = [iter(successors)]
+        keys = [initState.key() if path_check else None]
+        path_keys = set(keys)
+        while stack:
+            if self.budgeted and self.over_budget(self.nodes_expanded):
+                return False, next_bound
+            succ = next(stack[-1], None)
+            if succ is None:
+                #all successors explored---backtrack
+                stack.pop()
+                path_keys.discard(keys.pop())
+                continue
+
+            key = None
+            if path_check:
+                key = succ.key()
+                if key in path_keys:
+                    self.cycle_check_pruned = self.cycle_check_pruned + 1
+                    #BEGIN TRACING
+                    if self.trace > 1:
+                        print("   TRACE: Successor State <S{}:{}:{}> pruned by cycle checking".format(succ.index, succ.action_name(), key))
+                    #END TRACING
+                    continue
+
+            node = sNode(succ, heur_fn(succ), self.nodes_expanded)
+            self.nodes_expanded = self.nodes_expanded + 1
+            fval = node.gval + node.hval
+            if self.budgeted and node.hval < self.best_node.hval:
+                self.best_node = node
+
+            #BEGIN TRACING
+            if self.trace > 1:
+                print("   TRACE: Successor State: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(succ.index, succ.action_name(), succ.key(), node.gval, node.hval, fval))
+            #END TRACING
+
+            if fval > bound:
+                if next_bound is None or fval < next_bound:
+                    next_bound = fval
+                continue
+
+            if goal_fn(succ):
+                return node, next_bound
+
+            successors = succ.successors()
+            self.states_generated = self.states_generated + len(successors)
+            stack.append(iter(successors))
+            keys.append(key)
+            path_keys.add(key)
+            if len(stack) > self.max_open:
+                self.max_open = len(stack)
+
+        return False, next_bound
+
+    def searchAnytime(self, initState, goal_fn, heur_fn):
+        '''Anytime repairing A* (ARA*). Run a weighted A* search, ordering
+           OPEN by gval + weight*hval, until the best goal found costs no
+           more than the lowest key on OPEN. Then report the solution,
+           lower the weight and continue from the current OPEN set rather
+           than starting over. States whose gval improved after they were
+           expanded under the current weight are kept in an INCONS set
+           and put back on OPEN when the weight is lowered. Each solution
+           costs at most min(weight, cost/lower) times the optimal cost,
+           where lower is the lowest gval+hval on OPEN and INCONS (with
+           an admissible heuristic). The search ends after the weight 1
+           search, whose solution is optimal, or when a budget runs out;
+           in both cases the best goal node found is returned.'''
+
+        weight = self.anytime_weight
+        node = sNode(initState, heur_fn(initState), 0)
+        self.nodes_expanded = 1
+        self.cc_dictionary = dict()
+        self.cc_dictionary[initState.key()] = initState.gval
+        OPEN = [(node.gval + weight*node.hval, -node.gval, node.index, node)]
+        INCONS = dict()
+        self.solutions = []
+        goal_node = None
+
+        while True:
+            goal_node = self.improvePath(OPEN, INCONS, goal_fn, heur_fn, weight, goal_node)
+            if goal_node is None:
+                #OPEN ran out without a solution (or a budget ran out)
+                if self.exhausted:
+                    self.best_node = min([entry[3] for entry in OPEN], key=lambda nd: nd.hval, default=None)
+                return False
+
+            #Keep only the nodes that still hold their state's best gval.
+            nodes = dict()
+            for entry in OPEN:
+                nd = entry[3]
+                hsh = nd.state.key()
+                if nd.gval == self.cc_dictionary[hsh]:
+                    nodes[hsh] = nd
+            nodes.update(INCONS)
+            if nodes:
+                lower = min(nd.gval + nd.hval for nd in nodes.values())
+                bound = weight
+                if lower > 0:
+                    bound = max(1, min(weight, goal_node.gval / lower))
+            else:
+                #the whole space has been searched
+                bound = 1
+
+            if not self.solutions or bound < self.solutions[-1][1] or goal_node.gval < self.solutions[-1][0]:
+                self.solutions.append((goal_node.gval, bound, time.perf_counter() - self.start_wall_time))
+                if not self.quiet:
+                    print("Anytime A* solution: cost = {}, weight = {}, suboptimality bound = {:.3f}, nodes expanded = {}".format(goal_node.gval, weight, bound, self.nodes_expanded))
+                if self.anytime_solution_fn:
+                    self.anytime_solution_fn(goal_node.state, goal_node.gval, bound)
+
+            if self.exhausted or weight <= 1 or bound <= 1:
+                return goal_node
+
+            weight = max(1, weight - self.anytime_decrement)
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Anytime A* lowering weight to {}".format(weight))
+            #END TRACING
+            OPEN[:] = [(nd.gval + weight*nd.hval, -nd.gval, nd.index, nd) for nd in nodes.values()]
+            heapq.heapify(OPEN)
+            INCONS.clear()
+
+    def improvePath(self, OPEN, INCONS, goal_fn, heur_fn, weight, goal_node):
+        '''One weighted A* search of ARA*, continuing from OPEN. Return the
+           cheapest goal node found so far (None if there is none).'''
+
+        cc_dictionary = self.cc_dictionary
+        CLOSED = set()
+        while OPEN and (goal_node is None or goal_node.gval > OPEN[0][0]):
+            if len(OPEN) > self.max_open:
+                self.max_open = len(OPEN)
+            if self.budgeted and self.over_budget(self.nodes_expanded):
+                break
+            node = heapq.heappop(OPEN)[3]
+            state = node.state
+            hash_state = state.key()
+
+            #skip stale entries: the state was reached by a cheaper path,
+            #or was already expanded under the current weight.
+            if cc_dictionary[hash_state] < node.gval or hash_state in CLOSED:
+                continue
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, key=g+{}*h={}>".format(state.index, state.action_name(), hash_state, node.gval, node.hval, weight, node.gval + weight*node.hval))
+            #END TRACING
+
+            if goal_fn(state):
+                if goal_node is None or node.gval < goal_node.gval:
+                    goal_node = node
+                continue
+
+            CLOSED.add(hash_state)
+            successors = state.successors()
+            self.states_generated = self.states_generated + len(successors)
+            for succ in successors:
+                hash_succ = succ.key()
+                old_gval = cc_dictionary.get(hash_succ)
+                if old_gval is not None and succ.gval >= old_gval:
+                    self.cycle_check_pruned = self.cycle_check_pruned + 1
+                    continue
+                cc_dictionary[hash_succ] = succ.gval
+                succ_node = sNode(succ, heur_fn(succ), self.nodes_expanded)
+                self.nodes_expanded = self.nodes_expanded + 1
+                if hash_succ in CLOSED:
+                    INCONS[hash_succ] = succ_node
+                else:
+                    heapq.heappush(OPEN, (succ_node.gval + weight*succ_node.hval, -succ_node.gval, succ_node.index, succ_node))
+
+        return goal_node
+
+    def searchExternal(self, initState, goal_fn, heur_fn):
+        '''External memory A*. OPEN (an ExternalOpen) and the expanded
+           states (an ExternalClosed) are kept in run files on disk.
+           Buckets are expanded in order of fval and then gval. The
+           records of a bucket are merged in sorted order, so copies of
+           the same state are adjacent and only the first (lowest gval)
+           is kept, and they are merged with the keys of the expanded
+           states in the layers within locality, removing states that
+           were already expanded. The surviving records are expanded and
+           written to the bucket's run of expanded states. The fval of a
+           successor is never taken lower than the fval of its parent,
+           and with a consistent heuristic the first goal found is
+           optimal. The path to a goal is rebuilt by looking up each
+           parent in the layer of its gval.'''
+
+        directory = tempfile.mkdtemp(prefix='search', dir=self.external_directory)
+        try:
+            OPEN = ExternalOpen(directory, self.external_run_size)
+            CLOSED = ExternalClosed(directory)
+            hval = heur_fn(initState)
+            OPEN.insert((initState.gval + hval, initState.gval),
+                        (_dumps_key(initState.key()), initState.gval, hval, b"", None, _dumps_state(initState)))
+            self.nodes_expanded = 1
+            self.max_open = 1
+            best = None     #the expanded record with the lowest hval
+            goal = None
+
+            while not OPEN.empty() and goal is None and not self.exhausted:
+                ((fval, gval), records, paths) = OPEN.extract_bucket()
+                low_gval = None if self.external_locality is None else gval - self.external_locality
+                closed_keys = CLOSED.keys(low_gval)
+                closed_key = next(closed_keys, None)
+                closed_path = CLOSED.new_path()
+                closed_file = open(closed_path, 'wb')
+                pickler = pickle.Pickler(closed_file, pickle.HIGHEST_PROTOCOL)
+                last_key = None
+                try:
+                    for record in records:
+                        key = record[0]
+                        if key == last_key:
+                            self.cycle_check_pruned = self.cycle_check_pruned + 1
+                            continue
+                        last_key = key
+                        while closed_key is not None and closed_key < key:
+                            closed_key = next(closed_keys, None)
+                        if closed_key == key:
+                            self.cycle_check_pruned = self.cycle_check_pruned + 1
+                            continue
+                        if self.budgeted and self.over_budget(self.nodes_expanded):
+                            break
+
+                        pickler.dump(record)
+                        pickler.clear_memo()
+                        if self.budgeted and (best is None or record[2] < best[2]):
+                            best = record
+                        state = pickle.loads(record[5])
+
+                        #BEGIN TRACING
+                        if self.trace:
+                            print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(state.index, state.action_name(), state.key(), record[1], record[2], fval))
+                        #END TRACING
+
+                        if goal_fn(state):
+                            goal = record
+                            break
+
+                        successors = state.successors()
+                        self.states_generated = self.states_generated + len(successors)
+                        for succ in successors:
+                            succ_hval = heur_fn(succ)
+                            OPEN.insert((max(fval, succ.gval + succ_hval), succ.gval),
+                                        (_dumps_key(succ.key()), succ.gval, succ_hval, key, gval, _dumps_state(succ)))
+                            self.nodes_expanded = self.nodes_expanded + 1
+                        if len(OPEN) > self.max_open:
+                            self.max_open = len(OPEN)
+                finally:
+                    closed_file.close()
+                    CLOSED.add_run(gval, closed_path)
+                    records.close()
+                    closed_keys.close()
+                for path in paths:
+                    os.remove(path)
+
+            if goal is None:
+                if self.exhausted and best is not None:
+                    self.best_node = sNode(self.external_path(CLOSED, best), best[2])
+                return False
+            return sNode(self.external_path(CLOSED, goal), goal[2])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def external_path(self, CLOSED, record):
+        '''Return the state of an 'external_astar' record, with its parent
+           links restored by looking up its ancestors in CLOSED'''
+        path = [pickle.loads(record[5])]
+        while record[3]:
+            record = CLOSED.find(record[3], record[4])
+            path.append(pickle.loads(record[5]))
+        path.reverse()
+        return _relink_path(path)
+
+    def searchFrontier(self, initState, goal_fn, heur_fn):
+        '''Breadth first frontier search. The states of a layer are
+           expanded in turn, and each successor not found in the next
+           layer, the current layer or the recent layers kept (see
+           set_frontier) is added to the next layer with its parent link
+           removed, so earlier layers can be freed. For each state of the
+           next layer the position of its parent in the current layer
+           and its position in its parent's successors are appended to a
+           log (two arrays of ints per layer). The path to a goal is
+           rebuilt by following the log back to initState and calling
+           successors() again along the way, so successors() must
+           return the successors of a state in the same order each time
+           it is called. heur_fn is only used to pick the best state to
+           report when a budget runs out.'''
+
+        keep = self.frontier_layers
+        layer = [initState]
+        layer_keys = set([initState.key()])
+        old_keys = deque()  #the key sets of the layers kept, oldest first
+        log = []            #log[d] = (parents, positions) of layer d+1
+        self.nodes_expanded = 1
+        self.max_open = 1
+
+        while layer:
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Frontier BFS layer {}, {} states".format(len(log), len(layer)))
+            #END TRACING
+
+            next_layer = []
+            next_keys = set()
+            parents = array('I')
+            positions = array('I')
+            for (i, state) in enumerate(layer):
+                if self.budgeted and self.over_budget(self.nodes_expanded):
+                    best = min(range(len(layer)), key=lambda j: heur_fn(layer[j]))
+                    self.best_node = sNode(self.frontier_path(initState, log, best), heur_fn(layer[best]))
+                    return False
+                if goal_fn(state):
+                    return sNode(self.frontier_path(initState, log, i), heur_fn(state))
+
+                successors = state.successors()
+                self.states_generated = self.states_generated + len(successors)
+                for (position, succ) in enumerate(successors):
+                    key = succ.key()
+                    if key in next_keys or key in layer_keys or any(key in keys for keys in old_keys):
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        continue
+                    succ.parent = None
+                    next_layer.append(succ)
+                    next_keys.add(key)
+                    parents.append(i)
+                    positions.append(position)
+
+            self.nodes_expanded = self.nodes_expanded + len(next_layer)
+            if len(next_layer) > self.max_open:
+                self.max_open = len(next_layer)
+            log.append((parents, positions))
+            old_keys.append(layer_keys)
+            if keep is not None and len(old_keys) > keep:
+                old_keys.popleft()
+            layer = next_layer
+            layer_keys = next_keys
+
+        return False
+
+    def frontier_path(self, initState, log, index):
+        '''Return the state at position index of the last layer of a
+           'frontier_bfs' search, rebuilt with its path from initState
+           by replaying the positions recorded in log'''
+        route = []
+        for (parents, positions) in reversed(log):
+            route.append(positions[index])
+            index = parents[index]
+        state = initState
+        for position in reversed(route):
+            state = state.successors()[position]
+        return state
+
+    def searchBeam(self, initState, goal_fn, heur_fn):
+        '''Beam search. The nodes of the current depth are expanded in
+           turn (each one is checked for being a goal when it is
+           expanded, as in the other strategies), and of their successors
+           that pass cycle checking only the beam_width best are kept for
+           the next depth. With full cycle checking the cycle check
+           dictionary holds the states kept so far, so it too grows by at
+           most beam_width states per depth. The search fails when a
+           depth has no successors left.'''
+
+        width = self.beam_width
+        if self.beam_order == 'h':
+            order = lambda node: (node.hval, node.index)
+        else:
+            order = lambda node: (node.gval + node.hval, node.index)
+        full_check = self.cycle_check == _CC_FULL
+        path_check = self.cycle_check == _CC_PATH
+        cc_dictionary = self.cc_dictionary = dict()
+        cc_dictionary[initState.key()] = initState.gval
+        beam = [sNode(initState, heur_fn(initState), 0)]
+        self.nodes_expanded = 1
+        self.max_open = 1
+        depth = 0
+
+        while beam:
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Beam at depth {}: {} nodes, best h = {}".format(depth, len(beam), min(node.hval for node in beam)))
+            #END TRACING
+
+            candidates = []
+            for node in beam:
+                if self.budgeted and self.over_budget(self.nodes_expanded):
+                    self.best_node = min(beam, key=order)
+                    return False
+                state = node.state
+                if goal_fn(state):
+                    return node
+
+                successors = state.successors()
+                self.states_generated = self.states_generated + len(successors)
+                for succ in successors:
+                    if full_check:
+                        old_gval = cc_dictionary.get(succ.key())
+                        if old_gval is not None and succ.gval >= old_gval:
+                            self.cycle_check_pruned = self.cycle_check_pruned + 1
+                            continue
+                    elif path_check and succ.has_path_cycle():
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        continue
+                    candidates.append(sNode(succ, heur_fn(succ), self.nodes_expanded))
+                    self.nodes_expanded = self.nodes_expanded + 1
+
+            if len(candidates) > self.max_open:
+                self.max_open = len(candidates)
+            if len(candidates) > width:
+                beam = heapq.nsmallest(width, candidates, key=order)
+            else:
+                beam = candidates
+            if full_check:
+                #two candidates can be the same state: keep only the
+                #first of them (by order) in the beam
+                kept = []
+                for node in sorted(beam, key=order):
+                    key = node.state.key()
+                    old_gval = cc_dictionary.get(key)
+                    if old_gval is None or node.gval < old_gval:
+                        cc_dictionary[key] = node.gval
+                        kept.append(node)
+                beam = kept
+            depth = depth + 1
+
+        return False
+
+    def searchPartial(self, initState, goal_fn, heur_fn):
+        '''Partial expansion A*. Every node on OPEN has a stored fval,
+           at first its own gval+hval. Expanding a node generates all its
+           successors, but only those with fval equal to the stored fval
+           (or, the first time the node is expanded, at most the stored
+           fval) go on OPEN; the node goes back on OPEN as a _PartialNode
+           whose stored fval is the lowest fval of the successors left
+           out. As the stored fval only rises through the fvals of the
+           successors, each successor is put on OPEN once, when OPEN
+           reaches its fval. Successors pruned by cycle checking are
+           never counted, and only stored successors enter the cycle
+           check dictionary.'''
+
+        node = sNode(initState, heur_fn(initState), 0)
+        OPEN = self.make_open(node)
+        OPEN.insert(node)
+        insert = OPEN.insert
+        extract = OPEN.extract
+        open_size = OPEN.__len__
+        new_node = sNode
+        partial_node = _PartialNode
+        full_check = self.cycle_check == _CC_FULL
+        path_check = self.cycle_check == _CC_PATH
+        cc_dictionary = self.cc_dictionary = dict()
+        cc_dictionary[initState.key()] = initState.gval
+        cc_get = cc_dictionary.get
+        max_open = 0
+        pruned = 0
+        expanded = 1
+        generated = self.states_generated
+
+        check_at = self.next_budget_check(expanded)
+
+        goal_node = False
+        size = open_size()
+        while size:
+            if size > max_open:
+                max_open = size
+            if expanded >= check_at:
+                if self.check_budget(expanded):
+                    #nodes put back on OPEN have no hval to compare
+                    nodes = [nd for nd in OPEN.nodes() if type(nd) is not partial_node]
+                    if nodes:
+                        self.best_node = min(nodes, key=lambda nd: nd.hval)
+                    break
+                check_at = self.next_budget_check(expanded)
+            node = extract()
+            state = node.state
+
+            #skip nodes whose state was reached by a cheaper path
+            #after they were inserted into OPEN.
+            if full_check and cc_dictionary[state.key()] < node.gval:
+                size = open_size()
+                continue
+
+            first = type(node) is not partial_node
+            if first and goal_fn(state):
+                goal_node = node
+                break
+
+            stored_fval = node.gval + node.hval
+            next_fval = None
+            successors = state.successors()
+            generated = generated + len(successors)
+            for succ in successors:
+                gval = succ.gval
+                if full_check:
+                    hash_state = succ.key()
+                    old_gval = cc_get(hash_state)
+                    if old_gval is not None and gval > old_gval:
+                        pruned = pruned + 1
+                        continue
+                elif path_check and succ.has_path_cycle():
+                    pruned = pruned + 1
+                    continue
+                hval = heur_fn(succ)
+                fval = gval + hval
+                if fval == stored_fval or (first and fval < stored_fval):
+                    insert(new_node(succ, hval, expanded))
+                    expanded = expanded + 1
+                    if full_check:
+                        cc_dictionary[hash_state] = gval
+                elif fval > stored_fval and (next_fval is None or fval < next_fval):
+                    next_fval = fval
+
+            if next_fval is not None:
+                insert(partial_node(state, next_fval - node.gval, node.index))
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Expanded S{} with stored f = {}, next f = {}, OPEN size = {}".format(state.index, stored_fval, next_fval, open_size()))
+            #END TRACING
+
+            size = open_size()
+
+        self.max_open = max_open
+        self.cycle_check_pruned = pruned
+        self.nodes_expanded = expanded
+        self.states_generated = generated
+        return goal_node
+
+    def searchBidirectional(self, initState, goal_fn, heur_fn):
+        '''Bidirectional search. Each side keeps a heap of (fval, -gval,
+           index, node) entries and a dictionary mapping each state it
+           has reached to the node of its cheapest path. Every new node
+           is looked up in the other side's dictionary; a hit is a
+           solution through that state, and the cheapest one is kept. The
+           side with the smaller OPEN is expanded next. The search stops
+           when the cheapest solution costs no more than the lowest fval
+           on either OPEN (with heuristics front to end, i.e., estimating
+           the cost to the other end of the search), or than the sum of
+           the lowest gvals on the two OPENs (without heuristics), so no
+           cheaper solution can be found.'''
+
+        goals = self.bidirectional_goals
+        if not goals:
+            print("'bidirectional' needs goal states, see SearchEngine.set_bidirectional")
+            return False
+        heur_back_fn = self.bidirectional_heur_fn or _zero_hfn
+        forward_heur_fn = self.heur_cache.heur_fn if self.heur_cache else heur_fn
+        uninformed = forward_heur_fn is _zero_hfn and heur_back_fn is _zero_hfn
+
+        #side 0 searches forward from initState, side 1 backward from goals
+        opens = ([], [])
+        tables = (dict(), dict())
+        heurs = (heur_fn, heur_back_fn)
+        push = heapq.heappush
+        pop = heapq.heappop
+        best = [None, None, None]   #cost, forward node, backward node
+
+        def add(side, state):
+            '''Put state on OPEN of side (unless that side already has a
+               path to it as cheap) and look for it on the other side'''
+            key = state.key()
+            gval = state.gval
+            old = tables[side].get(key)
+            if old is not None and old.gval <= gval:
+                self.cycle_check_pruned = self.cycle_check_pruned + 1
+                return
+            node = sNode(state, heurs[side](state), self.nodes_expanded)
+            self.nodes_expanded = self.nodes_expanded + 1
+            tables[side][key] = node
+            push(opens[side], (gval + node.hval, -gval, node.index, node))
+            other = tables[1 - side].get(key)
+            if other is not None and (best[0] is None or gval + other.gval < best[0]):
+                best[0] = gval + other.gval
+                (best[1], best[2]) = (node, other) if side == 0 else (other, node)
+
+        add(0, initState)
+        for goal in goals:
+            add(1, goal)
+        self.states_generated = len(goals) + 1
+
+        while opens[0] and opens[1]:
+            size = len(opens[0]) + len(opens[1])
+            if size > self.max_open:
+                self.max_open = size
+            if best[0] is not None:
+                (top0, top1) = (opens[0][0][0], opens[1][0][0])
+                if best[0] <= max(top0, top1) or (uninformed and best[0] <= top0 + top1):
+                    break
+            if self.budgeted and self.over_budget(self.nodes_expanded):
+                self.best_node = min((entry[-1] for entry in opens[0]), key=lambda nd: nd.hval)
+                return False
+
+            side = 0 if len(opens[0]) <= len(opens[1]) else 1
+            node = pop(opens[side])[-1]
+            state = node.state
+            if tables[side][state.key()] is not node:
+                continue  #a cheaper path to the state was found later
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Expanding {} <S{}:{}:{}, g={}, h={}, f=g+h={}>".format('forward' if side == 0 else 'backward', state.index, state.action_name(), state.key(), node.gval, node.hval, node.gval+node.hval))
+            #END TRACING
+
+            neighbours = state.successors() if side == 0 else state.predecessors()
+            self.states_generated = self.states_generated + len(neighbours)
+            for succ in neighbours:
+                add(side, succ)
+
+        if best[0] is None:
+            return False
+        return sNode(self.bidirectional_path(best[1].state, best[2].state), 0)
+
+    def bidirectional_path(self, state, back_state):
+        '''Extend the forward path ending in state by the backward path
+           from back_state (the same problem state, reached by the
+           backward search) to its goal state. Copies of the states on
+           the backward path are linked on to state, with the actions and
+           gvals of the forward path. Return the goal state.'''
+        while back_state.parent is not None:
+            succ = copy.copy(back_state.parent)
+            succ.action = back_state.action
+            succ.gval = state.gval + back_state.gval - back_state.parent.gval
+            succ.parent = state
+            state = succ
+            back_state = back_state.parent
+        return state
+
+    def realtime_learned(self, state):
+        '''Return the dictionary of the hvals learned for the problem
+           of state (see set_realtime).'''
+        problem = state.problem()
+        learned = self.realtime_h.get(problem)
+        if learned is None:
+            learned = self.realtime_h[problem] = dict()
+        return learned
+
+    def searchRealtime(self, initState, goal_fn, heur_fn):
+        '''Real-time search. Each trial moves an agent from initState,
+           one action at a time (see realtimeStep), until it reaches a
+           goal; the path of the goal state returned is the route the
+           agent took. Trials are repeated, up to realtime_trials times,
+           until one changes no learned hval, and the cheapest route is
+           returned. The search fails if the agent reaches a state from
+           which no goal can be reached.'''
+
+        learned = self.realtime_learned(initState)
+        goal_node = False
+        for trial in range(self.realtime_trials):
+            state = initState
+            changed = False
+            while not goal_fn(state):
+                #a move can take many nodes and a lot of time, so the
+                #time and memory limits are checked before every move
+                if self.budgeted and self.check_budget(self.nodes_expanded):
+                    hval = learned.get(state.key())
+                    self.best_node = sNode(state, heur_fn(state) if hval is None else hval)
+                    return goal_node
+                (state, learnt) = self.realtimeStep(state, goal_fn, heur_fn)
+                if state is None:
+                    return goal_node
+                changed = changed or learnt
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Trial {} reached a goal at cost {}".format(trial + 1, state.gval))
+            #END TRACING
+
+            if not goal_node or state.gval < goal_node.gval:
+                goal_node = sNode(state, 0)
+            if not changed:
+                break  #the hvals have converged: the next trial is the same
+        return goal_node
+
+    def realtimeStep(self, initState, goal_fn, heur_fn):
+        '''Choose the move of a real-time agent in the non goal state
+           initState. A lookahead astar search from initState creates
+           nodes until the realtime_move_nodes or realtime_move_time
+           budget of the move runs out (after at least initState has been
+           expanded), or until it extracts a goal. Let fval be the lowest
+           fval on OPEN, or that of the goal. Each expanded state s then
+           learns the hval fval - g(s), where g(s) is its gval relative
+           to initState, if that is higher than its hval (the RTAA*
+           update), and the agent moves towards the node with that fval.
+           hvals are looked up in the hvals learned for the problem of
+           initState (realtime_learned) before calling heur_fn.
+           Return (successor of initState to move to, True if an hval was
+           raised), or (None, False) if no goal can be reached.'''
+
+        learned = self.realtime_learned(initState)
+        move_nodes = self.realtime_move_nodes
+        deadline = None if self.realtime_move_time is None else time.perf_counter() + self.realtime_move_time
+        push = heapq.heappush
+        pop = heapq.heappop
+        g0 = initState.gval
+
+        hval = learned.get(initState.key())
+        node = sNode(initState, heur_fn(initState) if hval is None else hval, self.nodes_expanded)
+        self.nodes_expanded = self.nodes_expanded + 1
+        created = 1
+        reached = {initState.key(): g0}
+        OPEN = [(node.gval + node.hval, -node.gval, node.index, node)]
+        expanded = []
+        best = None
+        while OPEN:
+            node = OPEN[0][-1]
+            state = node.state
+            if reached[state.key()] < node.gval:
+                pop(OPEN)   #a cheaper path to the state was found later
+                continue
+            if state is not initState and goal_fn(state):
+                best = node
+                break
+            if expanded and ((move_nodes is not None and created >= move_nodes) or
+                             (deadline is not None and time.perf_counter() >= deadline)):
+                best = node
+                break
+            pop(OPEN)
+            expanded.append(node)
+
+            successors = state.successors()
+            self.states_generated = self.states_generated + len(successors)
+            for succ in successors:
+                key = succ.key()
+                old_gval = reached.get(key)
+                if old_gval is not None and succ.gval >= old_gval:
+                    self.cycle_check_pruned = self.cycle_check_pruned + 1
+                    continue
+                reached[key] = succ.gval
+                hval = learned.get(key)
+                succ_node = sNode(succ, heur_fn(succ) if hval is None else hval, self.nodes_expanded)
+                self.nodes_expanded = self.nodes_expanded + 1
+                created = created + 1
+                push(OPEN, (succ.gval + succ_node.hval, -succ.gval, succ_node.index, succ_node))
+            if len(OPEN) > self.max_open:
+                self.max_open = len(OPEN)
+
+        if best is None or best.gval + best.hval == float('inf'):
+            #every state reachable from initState has been expanded (or
+            #leads only to states already known to be dead ends)
+            for node in expanded:
+                learned[node.state.key()] = float('inf')
+            return (None, False)
+
+        fval = best.gval + best.hval
+        changed = False
+        for node in expanded:
+            hval = fval - node.gval
+            if hval > node.hval:
+                learned[node.state.key()] = hval
+                changed = True
+        state = best.state
+        while state.parent is not initState:
+            state = state.parent
+
+        #BEGIN TRACING
+        if self.trace:
+            print("   TRACE: Lookahead of {} nodes from <S{}:{}:{}>, moving to <S{}:{}:{}> (h = {} -> {})".format(created, initState.index, initState.action_name(), initState.key(), state.index, state.action_name(), state.key(), expanded[0].hval, fval - g0))
+        #END TRACING
+
+        return (state, changed)
+
+    def realtime_move(self, state, goal_fn, heur_fn = _zero_hfn):
+        '''Return the successor of state that a real-time agent (see
+           set_realtime) would move to next, within the per move budget,
+           or None if state is a goal or no goal can be reached from it.
+           The hvals learned are kept, so later calls (and 'lrta_star'
+           searches) on the same problem choose better moves.'''
+        self.initStats()
+        if goal_fn(state):
+            return None
+        return self.realtimeStep(state, goal_fn, heur_fn)[0]
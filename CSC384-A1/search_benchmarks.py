@@ -0,0 +1,398 @@
+'''Benchmarks for the search routines in search.py, run on rushhour boards.
+
+   Usage: python3 search_benchmarks.py [--large]
+
+   --large also runs the board from rushhour.test(), which takes about a
+   minute per search.
+'''
+import os
+import sys
+import time
+from rushhour import *
+
+#(board_size, vehicle_list, goal_entrance, goal_direction)
+BOARDS = {
+    'tests': ((7, 7), [['gv', (1, 1), 2, True, True],
+                       ['1', (3, 1), 2, False, False],
+                       ['3', (4, 4), 2, False, False]], (4, 1), 'E'),
+    'rand9': ((6, 6), [['gv', (1, 4), 2, False, True], ['1', (4, 3), 2, False, False],
+                       ['2', (3, 2), 2, False, False], ['3', (5, 3), 3, True, False],
+                       ['4', (5, 1), 2, False, False], ['5', (2, 4), 3, False, False],
+                       ['6', (3, 0), 2, False, False], ['7', (3, 5), 3, True, False],
+                       ['8', (0, 0), 2, False, False]], (1, 2), 'N'),
+    'rand11a': ((6, 6), [['gv', (4, 2), 2, True, True], ['1', (3, 1), 2, False, False],
+                         ['2', (0, 2), 2, True, False], ['3', (3, 4), 2, False, False],
+                         ['4', (0, 5), 3, False, False], ['5', (1, 0), 2, False, False],
+                         ['6', (2, 4), 3, False, False], ['7', (0, 3), 2, False, False],
+                         ['8', (4, 4), 2, True, False], ['9', (3, 0), 2, True, False],
+                         ['10', (1, 3), 2, False, False]], (2, 2), 'E'),
+    'rand11b': ((6, 6), [['gv', (1, 4), 2, False, True], ['1', (0, 3), 3, True, False],
+                         ['2', (5, 3), 2, False, False], ['3', (3, 0), 3, True, False],
+                         ['4', (0, 0), 2, False, False], ['5', (5, 2), 2, True, False],
+                         ['6', (2, 2), 3, True, False], ['7', (2, 4), 2, True, False],
+                         ['8', (2, 5), 2, True, False], ['9', (4, 4), 2, False, False],
+                         ['10', (2, 1), 2, True, False]], (1, 2), 'N'),
+}
+
+LARGE_BOARDS = {
+    'test8': ((6, 6), [['g', (4, 3), 2, False, True], ['1', (0, 2), 2, True, False],
+                       ['2', (1, 5), 3, False, False], ['3', (2, 1), 2, True, False],
+                       ['4', (5, 4), 2, True, False], ['5', (3, 5), 2, False, False],
+                       ['6', (5, 1), 2, True, False], ['7', (4, 0), 3, True, False],
+                       ['8', (3, 2), 2, True, False], ['9', (0, 3), 3, True, False]], (4, 1), 'S'),
+}
+
+
+def make_board(name):
+    if name in BOARDS:
+        (board_size, vehicle_list, goal_entrance, goal_direction) = BOARDS[name]
+    else:
+        (board_size, vehicle_list, goal_entrance, goal_direction) = LARGE_BOARDS[name]
+    return make_init_state(board_size, [list(v) for v in vehicle_list], goal_entrance, goal_direction)
+
+
+def timed_search(se, state, goal_fn, heur_fn, repeat=1, node_limit=None):
+    '''Run a quiet se.search repeat times. Return the SearchResult of
+       the fastest run.'''
+    best = None
+    for i in range(repeat):
+        result = se.search(state, goal_fn, heur_fn, quiet=True, node_limit=node_limit)
+        if best is None or result.wall_time < best.wall_time:
+            best = result
+    return best
+
+
+def bench_open_types(boards):
+    '''Compare the heap of sNodes (Open) with the IndexedOpen priority queue
+       and the BucketOpen array of buckets for astar and best first search.'''
+    print("=========OPEN set: 'heap' vs 'indexed' vs 'bucket'=========")
+    print("{:8} {:10} {:8} {:>6} {:>10} {:>10} {:>8}".format('board', 'strategy', 'open', 'cost', 'expanded', 'seconds', 'speedup'))
+    for name in boards:
+        for strategy in ['astar', 'best_first']:
+            base = None
+            for ot in ['heap', 'indexed', 'bucket']:
+                se = SearchEngine(strategy, 'full')
+                se.set_open_type(ot)
+                repeat = 1 if name in LARGE_BOARDS else 5
+                result = timed_search(se, make_board(name), rushhour_goal_fn, heur_min_moves, repeat)
+                if base is None:
+                    base = result.wall_time
+                print("{:8} {:10} {:8} {:>6} {:>10} {:>10.4f} {:>8.2f}".format(name, strategy, ot, result.cost if result else '-', result.nodes_expanded, result.wall_time, base/result.wall_time))
+
+
+def bench_expansion_loops(boards, node_limit=20000):
+    '''Compare the general (traced) searchOpen loop, run with tracing off,
+       against the specialized loops searchOpen selects when tracing is off.
+       Searches stop after node_limit nodes: the general loop's path
+       checks walk the whole path, so deep depth first searches would
+       otherwise take hours.'''
+    print("=========searchOpen: general loop vs specialized loop=========")
+    print("{:8} {:14} {:12} {:>10} {:>10} {:>12} {:>8}".format('board', 'strategy', 'loop', 'expanded', 'seconds', 'expanded/s', 'speedup'))
+    for name in boards:
+        for (strategy, cc) in [('astar', 'full'), ('depth_first', 'path')]:
+            base = None
+            for loop in ['general', 'specialized']:
+                se = SearchEngine(strategy, cc)
+                se.general_loop = loop == 'general'
+                repeat = 1 if name in LARGE_BOARDS else 5
+                result = timed_search(se, make_board(name), rushhour_goal_fn, heur_min_moves, repeat, node_limit)
+                rate = result.nodes_expanded/result.wall_time
+                if base is None:
+                    base = rate
+                print("{:8} {:14} {:12} {:>10} {:>10.4f} {:>12.0f} {:>8.2f}".format(name, strategy+'/'+cc, loop, result.nodes_expanded, result.wall_time, rate, rate/base))
+
+
+def bench_batch(boards, copies=20):
+    '''Compare solving copies of each board one at a time in this process
+       with batch_search over a process pool.'''
+    from parallel_search import batch_search
+    print("=========Batch solving: serial vs batch_search=========")
+    states = [make_board(name) for name in boards for i in range(copies)]
+    se = SearchEngine('astar', 'full')
+    start = time.perf_counter()
+    for state in states:
+        se.search(state, rushhour_goal_fn, heur_min_moves, quiet=True)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    for (i, result) in batch_search(states, rushhour_goal_fn, heur_min_moves, 'astar', 'full'):
+        pass
+    batch = time.perf_counter() - start
+    print("{} searches: serial {:.3f}s, batch_search {:.3f}s, speedup {:.2f}".format(len(states), serial, batch, serial/batch))
+
+
+def bench_node_memory(name='test8', nodes=100000):
+    '''Measure the memory held per node, the time per node and the number of
+       rushhour.hashable_state calls in an astar search stopped after the
+       given number of nodes.'''
+    import tracemalloc
+    print("=========Memory and hashing per node ({} nodes of '{}')=========".format(nodes, name))
+    se = SearchEngine('astar', 'full')
+    result = se.search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True, node_limit=nodes)
+    seconds = result.wall_time
+
+    calls = [0]
+    hashable_state = rushhour.hashable_state
+    def counting_hashable_state(self):
+        calls[0] += 1
+        return hashable_state(self)
+    rushhour.hashable_state = counting_hashable_state
+    tracemalloc.start()
+    try:
+        result = se.search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True, node_limit=nodes)
+        (current, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        rushhour.hashable_state = hashable_state
+    print("nodes = {}, states = {}, seconds = {:.3f}, us/node = {:.1f}".format(result.nodes_expanded, result.states_generated, seconds, 1e6*seconds/result.nodes_expanded))
+    print("peak memory = {:.1f} MB, bytes/node = {:.0f}, hashable_state calls = {} ({:.2f}/node)".format(peak/2**20, peak/result.nodes_expanded, calls[0], calls[0]/result.nodes_expanded))
+
+
+def bench_external(boards, run_size=50000):
+    '''Compare the peak memory and time of astar, keeping OPEN and the
+       cycle check dictionary in memory, with external_astar, keeping
+       them on disk (with locality 2, enough for rushhour, and with
+       every expanded state checked).'''
+    import tracemalloc
+    print("=========astar vs external_astar (run_size = {})=========".format(run_size))
+    print("{:8} {:16} {:>8} {:>6} {:>10} {:>10} {:>10}".format('board', 'strategy', 'locality', 'cost', 'nodes', 'seconds', 'peak MB'))
+    for name in boards:
+        for (strategy, locality) in [('astar', None), ('external_astar', 2), ('external_astar', None)]:
+            se = SearchEngine(strategy)
+            se.set_external(run_size=run_size, locality=locality)
+            tracemalloc.start()
+            try:
+                result = se.search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True)
+                (current, peak) = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            print("{:8} {:16} {:>8} {:>6} {:>10} {:>10.3f} {:>10.1f}".format(name, strategy, str(locality), result.cost, result.nodes_expanded, result.wall_time, peak/2**20))
+
+
+def no_goal_fn(state):
+    return False
+
+
+def bench_frontier(boards, sweep_boards=['tests']):
+    '''Compare the peak memory and time of breadth_first (with full cycle
+       checking) and frontier_bfs solving each board, and sweeping every
+       state reachable from each of sweep_boards (a goal function that is
+       never true).'''
+    import tracemalloc
+    print("=========breadth_first vs frontier_bfs=========")
+    print("{:8} {:6} {:14} {:>6} {:>10} {:>10} {:>10} {:>10}".format('board', 'goal', 'strategy', 'cost', 'nodes', 'widest', 'seconds', 'peak MB'))
+    runs = [(name, 'solve', rushhour_goal_fn, 1) for name in boards]
+    runs = runs + [(name, 'sweep', no_goal_fn, 1) for name in sweep_boards]
+    for (name, goal, goal_fn, layers) in runs:
+        for strategy in ['breadth_first', 'frontier_bfs']:
+            se = SearchEngine(strategy)
+            se.set_frontier(layers)
+            tracemalloc.start()
+            try:
+                result = se.search(make_board(name), goal_fn, quiet=True)
+                (current, peak) = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            print("{:8} {:6} {:14} {:>6} {:>10} {:>10} {:>10.3f} {:>10.1f}".format(name, goal, strategy, str(result.cost), result.nodes_expanded, result.max_open, result.wall_time, peak/2**20))
+
+def bench_beam(nboards=4, board_size=(9, 9), nvehicles=20, time_limit=20, seed=1):
+    '''Compare astar with beam search of several widths on random boards
+       from make_rand_init_state, each search limited to time_limit
+       seconds.'''
+    import random
+    print("=========astar vs beam on random {}x{} boards with {} vehicles=========".format(board_size[0], board_size[1], nvehicles))
+    print("{:6} {:22} {:>6} {:>10} {:>10}".format('board', 'strategy', 'cost', 'nodes', 'seconds'))
+    random.seed(seed)
+    for i in range(nboards):
+        state = make_rand_init_state(nvehicles, board_size)
+        for width in [None, 10, 100, 1000]:
+            if width is None:
+                se = SearchEngine('astar', 'full')
+            else:
+                se = SearchEngine('beam')
+                se.set_beam(width)
+            result = se.search(state, rushhour_goal_fn, heur_min_moves, quiet=True, time_limit=time_limit)
+            print("{:6} {:22} {:>6} {:>10} {:>10.2f}".format(i, result.strategy.split(' with')[0], str(result.cost) if result else result.exhausted or 'failed', result.nodes_expanded, result.wall_time))
+
+
+def bench_hda(boards, processes=[1, 2, 4, 8]):
+    '''Compare astar with hda_star over several numbers of worker
+       processes. Speedups need at least as many free CPUs as workers;
+       with fewer, the workers take turns and the extra nodes they expand
+       (beyond the ones astar would) only cost time.'''
+    from parallel_search import hda_star
+    print("=========astar vs hda_star ({} CPUs)=========".format(os.cpu_count()))
+    print("{:8} {:12} {:>6} {:>10} {:>10} {:>10} {:>8}".format('board', 'strategy', 'cost', 'nodes', 'seconds', 'cpu', 'speedup'))
+    for name in boards:
+        se = SearchEngine('astar', 'full')
+        result = se.search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True)
+        base = result.wall_time
+        print("{:8} {:12} {:>6} {:>10} {:>10.3f} {:>10.3f} {:>8.2f}".format(name, 'astar', result.cost, result.nodes_expanded, result.wall_time, result.cpu_time, 1.0))
+        for p in processes:
+            result = hda_star(make_board(name), rushhour_goal_fn, heur_min_moves, processes=p)
+            print("{:8} {:12} {:>6} {:>10} {:>10.3f} {:>10.3f} {:>8.2f}".format(name, 'hda_star/'+str(p), result.cost, result.nodes_expanded, result.wall_time, result.cpu_time, base/result.wall_time))
+
+
+def bench_lazy(boards, cost=100e-6):
+    '''Compare eager and lazy heuristic evaluation in astar, with
+       heur_min_moves and with heur_min_moves made to take (at least)
+       cost seconds longer per call, standing in for an expensive
+       heuristic.'''
+    def slow_min_moves(state):
+        end = time.perf_counter() + cost
+        while time.perf_counter() < end:
+            pass
+        return heur_min_moves(state)
+
+    print("=========astar: eager vs lazy heuristic evaluation=========")
+    print("{:8} {:12} {:6} {:>6} {:>10} {:>10} {:>10} {:>10} {:>8}".format('board', 'heuristic', 'eval', 'cost', 'nodes', 'h calls', 'h saved', 'seconds', 'speedup'))
+    for name in boards:
+        for (hname, heur_fn) in [('min_moves', heur_min_moves), ('slow', slow_min_moves)]:
+            base = None
+            for lazy in [False, True]:
+                se = SearchEngine('astar', 'full')
+                se.set_lazy_heuristic(lazy)
+                result = se.search(make_board(name), rushhour_goal_fn, heur_fn, quiet=True)
+                if base is None:
+                    base = result.wall_time
+                calls = result.heuristic_calls if lazy else result.nodes_expanded
+                print("{:8} {:12} {:6} {:>6} {:>10} {:>10} {:>10} {:>10.3f} {:>8.2f}".format(name, hname, 'lazy' if lazy else 'eager', result.cost, result.nodes_expanded, calls, result.heuristic_saved or 0, result.wall_time, base/result.wall_time))
+
+
+def bench_partial(boards):
+    '''Compare the OPEN size, peak memory and time of astar and
+       pea_star.'''
+    import tracemalloc
+    print("=========astar vs pea_star=========")
+    print("{:8} {:10} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}".format('board', 'strategy', 'cost', 'nodes', 'generated', 'max open', 'seconds', 'peak MB'))
+    for name in boards:
+        for strategy in ['astar', 'pea_star']:
+            se = SearchEngine(strategy, 'full')
+            tracemalloc.start()
+            try:
+                result = se.search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True)
+                (current, peak) = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            print("{:8} {:10} {:>6} {:>10} {:>10} {:>10} {:>10.3f} {:>10.1f}".format(name, strategy, result.cost, result.nodes_expanded, result.states_generated, result.max_open, result.wall_time, peak/2**20))
+
+
+def bench_bidirectional(boards):
+    '''Compare breadth_first and bidirectional search for a path to one
+       goal state of each board: the goal state of the solution astar
+       finds.'''
+    print("=========breadth_first vs bidirectional (to the goal state found by astar)=========")
+    print("{:8} {:14} {:>6} {:>10} {:>10} {:>10}".format('board', 'strategy', 'cost', 'nodes', 'seconds', 'speedup'))
+    for name in boards:
+        astar = SearchEngine('astar', 'full').search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True)
+        (board_size, vehicle_list, goal_entrance, goal_direction) = BOARDS[name] if name in BOARDS else LARGE_BOARDS[name]
+        goal = make_init_state(board_size, astar.goal.get_vehicle_statuses(), goal_entrance, goal_direction)
+        goal_key = goal.key()
+        base = None
+        for strategy in ['breadth_first', 'bidirectional']:
+            se = SearchEngine(strategy)
+            se.set_bidirectional(goal)
+            result = se.search(make_board(name), lambda state: state.key() == goal_key, quiet=True)
+            if base is None:
+                base = result.wall_time
+            print("{:8} {:14} {:>6} {:>10} {:>10.3f} {:>10.1f}".format(name, strategy, result.cost, result.nodes_expanded, result.wall_time, base/result.wall_time))
+
+
+def bench_checkpoint(boards, intervals=[None, 100000, 20000]):
+    '''Time astar with checkpoints every interval nodes (None for none),
+       with the number of checkpoints written, the time spent writing
+       them and the checkpoint file size.'''
+    import tempfile
+    print("=========astar with checkpoints=========")
+    print("{:8} {:>10} {:>10} {:>12} {:>10} {:>10} {:>10}".format('board', 'interval', 'nodes', 'checkpoints', 'seconds', 'writing s', 'file MB'))
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'search.checkpoint')
+    try:
+        for name in boards:
+            for interval in intervals:
+                se = SearchEngine('astar', 'full')
+                if interval is not None:
+                    se.set_checkpoint(path, interval, rushhour_encode, rushhour_decode)
+                result = se.search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True)
+                size = os.path.getsize(path)/2**20 if se.checkpoints else 0
+                print("{:8} {:>10} {:>10} {:>12} {:>10.3f} {:>10.3f} {:>10.1f}".format(name, str(interval), result.nodes_expanded, se.checkpoints, result.wall_time, se.checkpoint_time, size))
+                if os.path.exists(path):
+                    os.remove(path)
+    finally:
+        os.rmdir(directory)
+
+
+def bench_realtime(boards, move_nodes=[100, 1000], max_moves=2000):
+    '''Move a real-time agent from the start of each board with
+       realtime_move (one trial, at most max_moves moves), and report the
+       longest time a move took next to the time astar takes to solve
+       the board.'''
+    print("=========real-time moves (lrta_star lookahead) vs astar=========")
+    print("{:8} {:>10} {:>8} {:>10} {:>14} {:>10} {:>14}".format('board', 'lookahead', 'moves', 'cost', 'max move ms', 'astar cost', 'astar seconds'))
+    for name in boards:
+        astar = SearchEngine('astar', 'full').search(make_board(name), rushhour_goal_fn, heur_min_moves, quiet=True)
+        for nodes in move_nodes:
+            se = SearchEngine('lrta_star')
+            se.set_realtime(nodes)
+            state = make_board(name)
+            moves = 0
+            longest = 0
+            while moves < max_moves and not rushhour_goal_fn(state):
+                start = time.perf_counter()
+                state = se.realtime_move(state, rushhour_goal_fn, heur_min_moves)
+                longest = max(longest, time.perf_counter() - start)
+                moves = moves + 1
+            cost = state.gval if rushhour_goal_fn(state) else '-'
+            print("{:8} {:>10} {:>8} {:>10} {:>14.2f} {:>10} {:>14.3f}".format(name, nodes, moves, cost, longest*1000, astar.cost, astar.wall_time))
+
+
+def bench_telemetry(boards, interval=10000, repeat=3):
+    '''Time astar and breadth_first with and without telemetry samples
+       (written to a JSONL file every interval nodes), taking the
+       fastest of repeat alternating runs of each.'''
+    import tempfile
+    print("=========search telemetry overhead=========")
+    print("{:8} {:14} {:>10} {:>8} {:>10} {:>10} {:>9}".format('board', 'strategy', 'nodes', 'samples', 'off s', 'on s', 'overhead'))
+    (fd, path) = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    try:
+        for name in boards:
+            for (strategy, heur_fn) in [('astar', heur_min_moves), ('breadth_first', heur_zero)]:
+                plain = SearchEngine(strategy, 'full')
+                sampled = SearchEngine(strategy, 'full')
+                sampled.set_telemetry(path, interval)
+                #alternate the runs, so both see the same machine load
+                (off, on) = (None, None)
+                for i in range(repeat):
+                    result = timed_search(plain, make_board(name), rushhour_goal_fn, heur_fn)
+                    if off is None or result.wall_time < off.wall_time:
+                        off = result
+                    result = timed_search(sampled, make_board(name), rushhour_goal_fn, heur_fn)
+                    if on is None or result.wall_time < on.wall_time:
+                        on = result
+                with open(path) as f:
+                    samples = sum(1 for line in f) // repeat
+                os.remove(path)
+                print("{:8} {:14} {:>10} {:>8} {:>10.3f} {:>10.3f} {:>8.1f}%".format(name, strategy, off.nodes_expanded, samples, off.wall_time, on.wall_time, 100*(on.wall_time/off.wall_time - 1)))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    boards = list(BOARDS)
+    if '--large' in sys.argv:
+        boards = boards + list(LARGE_BOARDS)
+    bench_open_types(boards)
+    bench_expansion_loops(boards)
+    bench_batch(boards)
+    bench_node_memory()
+    bench_external(boards)
+    bench_frontier(boards)
+    bench_beam()
+    bench_hda(boards)
+    bench_lazy(boards)
+    bench_partial(boards)
+    bench_bidirectional(boards)
+    bench_checkpoint(boards)
+    bench_realtime(boards)
+    bench_telemetry(boards)
@@ -0,0 +1,766 @@
+#Tests for the search strategies provided by search.py, run on the
+#WaterJugs and rushhour state spaces.
+import io
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import contextlib
+import gc
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from WaterJugs import *
+from rushhour import *
+from search import _ASTAR
+from parallel_search import *
+
+totalTests = 0
+passedTests = 0
+
+
+def check(description, result):
+    global totalTests, passedTests
+    totalTests += 1
+    if result:
+        passedTests += 1
+        print("\t {} passed.".format(description))
+    else:
+        print("\t ERROR: {} failed.".format(description))
+
+
+def rushhour_small():
+    return make_init_state((7, 7), [['gv', (1, 1), 2, True, True],
+                                    ['1', (3, 1), 2, False, False],
+                                    ['3', (4, 4), 2, False, False]], (4, 1), 'E')
+
+
+def test_ida_star():
+    print("Now testing the 'ida_star' strategy:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    se = SearchEngine('ida_star')
+    goal = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function)
+    check("IDA* finds an optimal WaterJugs solution", goal and goal.gval == 5)
+
+    waterjugs_set_goal(2, 1)
+    check("IDA* fails on an unreachable WaterJugs goal",
+          se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function) is False)
+
+    goal = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves)
+    check("IDA* finds an optimal rushhour solution", goal and goal.gval == 3)
+
+
+def test_indexed_open():
+    print("Now testing the 'indexed' OPEN set:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    OPEN = IndexedOpen(_ASTAR)
+    OPEN.insert(sNode(WaterJugs("A", 3, 3, 0, s0), 4))
+    OPEN.insert(sNode(WaterJugs("B", 1, 0, 4, s0), 4))
+    OPEN.insert(sNode(WaterJugs("C", 1, 3, 0, s0), 4))
+    OPEN.insert(sNode(WaterJugs("D", 4, 0, 4, s0), 1))
+    check("IndexedOpen holds one node per state", len(OPEN.open) == 2)
+    check("IndexedOpen keeps the cheapest node for each state",
+          OPEN.extract().state.action == "B" and OPEN.extract().state.action == "C" and OPEN.empty())
+
+    waterjugs_set_goal(2, 0)
+    for strategy in ['astar', 'best_first']:
+        se = SearchEngine(strategy, 'full')
+        se.set_open_type('indexed')
+        goal = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function)
+        check("{} with an indexed OPEN solves WaterJugs".format(strategy),
+              goal and (strategy != 'astar' or goal.gval == 5))
+    se = SearchEngine('astar', 'full')
+    se.set_open_type('indexed')
+    goal = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves)
+    check("astar with an indexed OPEN finds an optimal rushhour solution", goal and goal.gval == 3)
+
+
+def test_bucket_open():
+    print("Now testing the 'bucket' OPEN set:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    OPEN = BucketOpen(_ASTAR)
+    OPEN.insert(sNode(WaterJugs("A", 3, 3, 0, s0), 4))
+    OPEN.insert(sNode(WaterJugs("B", 1, 0, 4, s0), 4))
+    OPEN.insert(sNode(WaterJugs("C", 4, 3, 4, s0), 1))
+    check("BucketOpen extracts lowest f, breaking ties by greatest g",
+          [OPEN.extract().state.action for i in range(3)] == ["C", "B", "A"] and OPEN.empty())
+    OPEN.insert(sNode(WaterJugs("A", 3, 3, 0, s0), 4))
+    OPEN.insert(sNode(WaterJugs("B", 1, 0, 4, s0), 0.5))
+    check("BucketOpen falls back to a heap on non-integer keys",
+          OPEN.extract().state.action == "B" and OPEN.extract().state.action == "A" and OPEN.empty())
+
+    waterjugs_set_goal(2, 0)
+    for ot in ['bucket', 'auto']:
+        se = SearchEngine('astar', 'full')
+        se.set_open_type(ot)
+        goal = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function)
+        check("astar with a '{}' OPEN solves WaterJugs optimally".format(ot), goal and goal.gval == 5)
+        goal = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves)
+        check("astar with a '{}' OPEN solves rushhour optimally".format(ot), goal and goal.gval == 3)
+
+    def half_h(state):
+        #0 for the initial state, so the search starts out with buckets
+        return 0 if state.hashable_state() == (0, 0) else 0.5
+    for (strategy, cc, lazy) in [('astar', 'full', False), ('astar', 'path', False), ('astar', 'none', False),
+                                 ('best_first', 'full', False), ('astar', 'full', True), ('pea_star', 'full', False)]:
+        for ot in ['bucket', 'auto']:
+            se = SearchEngine(strategy, cc)
+            se.set_open_type(ot)
+            se.set_lazy_heuristic(lazy)
+            result = se.search(s0, waterjugs_goal_fn, half_h, quiet=True)
+            check("{}/{}{} search with a '{}' OPEN carries on after it falls back to a heap".format(
+                      strategy, cc, " (lazy)" if lazy else "", ot),
+                  result and (strategy == 'best_first' or result.cost == 5))
+
+
+def test_quiet_search():
+    print("Now testing quiet search:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    for strategy in ['astar', 'ida_star']:
+        se = SearchEngine(strategy)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+        check("quiet {} search prints nothing".format(strategy), out.getvalue() == "")
+        check("quiet {} search returns a SearchResult".format(strategy),
+              isinstance(result, SearchResult) and result and result.cost == 5 and
+              len(result.actions) == 5 and result.nodes_expanded > 0 and result.max_open > 0)
+
+    waterjugs_set_goal(2, 1)
+    result = SearchEngine('breadth_first').search(s0, waterjugs_goal_fn, quiet=True)
+    check("quiet search of an unreachable goal returns a false SearchResult",
+          not result and result.goal is None and result.actions is None)
+
+
+def test_budgets():
+    print("Now testing search budgets:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 1)
+    for strategy in ['breadth_first', 'ida_star']:
+        se = SearchEngine(strategy, 'none')
+        result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True, node_limit=200)
+        check("{} stops at its node limit".format(strategy),
+              not result and result.exhausted == 'node_limit' and
+              200 <= result.nodes_expanded < 220 and result.best is not None)
+        result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True, time_limit=0.05)
+        check("{} stops at its time limit".format(strategy),
+              not result and result.exhausted == 'time_limit' and result.wall_time < 1)
+
+    waterjugs_set_goal(2, 0)
+    result = SearchEngine('astar').search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True, node_limit=1000, time_limit=10)
+    check("a search finishing within its budgets is not stopped", result and result.exhausted is None)
+
+
+def test_anytime_astar():
+    print("Now testing the 'anytime_astar' strategy:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    found = []
+    se = SearchEngine('anytime_astar')
+    se.set_anytime(5, 1, lambda state, cost, bound: found.append((cost, bound)))
+    result = se.search(s0, waterjugs_goal_fn, waterjugs_h_sum_function, quiet=True)
+    check("anytime A* ends with an optimal WaterJugs solution",
+          result and result.cost == 5 and result.bound == 1)
+    check("anytime A* reports each solution with a bound",
+          found and found == [(cost, bound) for (cost, bound, t) in result.solutions] and
+          all(cost <= bound * 5 for (cost, bound) in found))
+
+    result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    check("anytime A* ends with an optimal rushhour solution", result and result.cost == 3)
+
+    waterjugs_set_goal(2, 1)
+    check("anytime A* fails on an unreachable WaterJugs goal",
+          not se.search(s0, waterjugs_goal_fn, waterjugs_h_sum_function, quiet=True))
+
+    for strategy in ['anytime_astar', 'external_astar', 'frontier_bfs', 'bidirectional', 'lrta_star']:
+        messages = []
+        for cc in ['none', 'path', 'full']:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                se.set_strategy(strategy, cc)
+            messages.append(out.getvalue())
+        check("'{}' says it overrides only the 'none' and 'path' cycle checks".format(strategy),
+              messages[0] and messages[1] and messages[2] == "" and
+              se.get_strategy().endswith('full cycle checking'))
+
+
+def test_portfolio_search():
+    print("Now testing portfolio search:")
+    configs = [('astar', 'full', heur_min_moves), ('depth_first', 'path', None)]
+    (config, result) = portfolio_search(rushhour_small(), rushhour_goal_fn, configs)
+    check("portfolio search returns a winning configuration and its solution",
+          config in configs and result and rushhour_goal_fn(result.goal) and
+          len(result.actions) == result.cost)
+
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 1)
+    (config, result) = portfolio_search(s0, waterjugs_goal_fn, [('breadth_first', 'full', None), ('astar', 'full', waterjugs_h_max_function)],
+                                        initializer=waterjugs_set_goal, initargs=(2, 1))
+    check("portfolio search fails when no configuration finds a goal", config is None and not result)
+
+
+def test_batch_search():
+    print("Now testing batch search:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    states = [s0, WaterJugs("START", 0, 2, 0), WaterJugs("START", 0, 3, 3)]
+    results = dict(batch_search(states, waterjugs_goal_fn, waterjugs_h_max_function,
+                                processes=2, chunksize=1,
+                                initializer=waterjugs_set_goal, initargs=(2, 0)))
+    check("batch search returns one result per initial state",
+          sorted(results) == [0, 1, 2] and all(results.values()))
+    check("batch search results match the initial states",
+          [results[i].cost for i in range(3)] == [5, 0, 2])
+
+
+def test_heuristic_cache():
+    print("Now testing the heuristic cache:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    calls = []
+    def counting_h(state):
+        calls.append(state.hashable_state())
+        return waterjugs_h_max_function(state)
+
+    cache = HeuristicCache(counting_h, 2)
+    a, b, c = WaterJugs("A", 1, 3, 0, s0), WaterJugs("B", 1, 0, 4, s0), WaterJugs("C", 2, 3, 4, s0)
+    values = [cache(a), cache(b), cache(WaterJugs("A2", 2, 3, 0, s0)), cache(c), cache(b)]
+    check("HeuristicCache returns the heuristic's values",
+          values == [waterjugs_h_max_function(x) for x in [a, b, a, c, b]])
+    check("HeuristicCache evicts the least recently used value",
+          cache.hits == 1 and cache.misses == 4 and calls == [(3, 0), (0, 4), (3, 4), (0, 4)])
+
+    se = SearchEngine('ida_star')
+    plain = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+    se.set_heuristic_cache(1000)
+    cached = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+    check("a cached heuristic gives the same search",
+          cached.cost == plain.cost and cached.nodes_expanded == plain.nodes_expanded)
+    check("a cached heuristic is evaluated once per distinct state",
+          cached.heuristic_misses <= 16 and cached.heuristic_hits + cached.heuristic_misses == cached.nodes_expanded + 1)
+
+
+def test_incremental_path_checking():
+    print("Now testing incremental path checking:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    for goal in [(2, 0), (2, 1)]:
+        waterjugs_set_goal(*goal)
+        se = SearchEngine('depth_first', 'path')
+        incremental = se.search(s0, waterjugs_goal_fn, quiet=True)
+        se.searchOpenDepthPath = se.searchOpenPath
+        chained = se.search(s0, waterjugs_goal_fn, quiet=True)
+        check("depth first path checking with goal {} prunes as has_path_cycle does".format(goal),
+              incremental.cost == chained.cost and
+              incremental.nodes_expanded == chained.nodes_expanded and
+              incremental.cycle_check_pruned == chained.cycle_check_pruned > 0)
+
+
+def test_state_keys():
+    print("Now testing cached state keys:")
+    calls = []
+    class CountingJugs(WaterJugs):
+        __slots__ = ()
+        def hashable_state(self):
+            calls.append(self.action)
+            return WaterJugs.hashable_state(self)
+
+    s0 = CountingJugs("START", 0, 0, 0)
+    check("key() computes hashable_state once",
+          s0.key() == s0.hashable_state() and s0.key() is s0.key() and len(calls) == 2)
+    check("states and nodes have no per-object dictionary",
+          not hasattr(s0, '__dict__') and not hasattr(sNode(s0, 0), '__dict__'))
+
+
+def test_concurrent_searches():
+    print("Now testing concurrent searches in threads:")
+    waterjugs_set_goal(2, 0)
+    configs = [('astar', 'full', heur_min_moves), ('best_first', 'full', heur_min_moves),
+               ('breadth_first', 'full', None), ('ida_star', 'path', heur_min_moves)] * 4
+    def run(config):
+        (strategy, cc_level, heur_fn) = config
+        se = SearchEngine(strategy, cc_level)
+        result = se.search(rushhour_small(), rushhour_goal_fn, heur_fn or heur_zero, quiet=True)
+        return (result.cost, result.nodes_expanded, result.states_generated)
+
+    serial = [run(config) for config in configs]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)     #switch threads as often as possible
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            threaded = list(pool.map(run, configs))
+    finally:
+        sys.setswitchinterval(interval)
+    check("searches run in threads match the same searches run one at a time", threaded == serial)
+
+
+def test_external_astar():
+    print("Now testing the 'external_astar' strategy:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    directory = tempfile.mkdtemp()
+    se = SearchEngine('external_astar')
+    se.set_external(directory, run_size=3)
+    result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+    check("external A* finds an optimal WaterJugs solution with its path",
+          result and result.cost == 5 and len(result.actions) == 5 and result.goal.parent.gval == 4)
+    check("external A* removes its run files", os.listdir(directory) == [])
+
+    waterjugs_set_goal(2, 1)
+    check("external A* fails on an unreachable WaterJugs goal",
+          not se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True))
+    result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True, node_limit=20)
+    check("external A* stops at its node limit with the path to its best state",
+          not result and result.exhausted == 'node_limit' and result.best.parent is not None)
+
+    se.set_external(directory, run_size=10, locality=2)
+    result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    check("external A* with locality 2 finds an optimal rushhour solution", result and result.cost == 3)
+    os.rmdir(directory)
+
+
+def test_frontier_bfs():
+    print("Now testing the 'frontier_bfs' strategy:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    se = SearchEngine('frontier_bfs')
+    se.set_frontier(None)
+    result = se.search(s0, waterjugs_goal_fn, quiet=True)
+    check("frontier BFS finds an optimal WaterJugs solution with its path",
+          result and result.cost == 5 and len(result.actions) == 5 and result.goal.parent.gval == 4)
+    waterjugs_set_goal(2, 1)
+    check("frontier BFS keeping every layer fails on an unreachable WaterJugs goal",
+          not se.search(s0, waterjugs_goal_fn, quiet=True))
+
+    se.set_frontier(1)
+    result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True, node_limit=100)
+    path = [result.best]
+    while path[-1].parent:
+        path.append(path[-1].parent)
+    check("frontier BFS stops at its node limit with the path to its best state",
+          not result and result.exhausted == 'node_limit' and len(path) == result.best.gval + 1 and
+          path[-1].hashable_state() == s0.hashable_state())
+
+    bfs = SearchEngine('breadth_first').search(rushhour_small(), rushhour_goal_fn, quiet=True)
+    result = se.search(rushhour_small(), rushhour_goal_fn, quiet=True)
+    check("frontier BFS keeping one layer finds an optimal rushhour solution",
+          result and result.cost == bfs.cost == 3 and result.max_open < bfs.max_open)
+
+
+def test_beam():
+    print("Now testing the 'beam' strategy:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    se = SearchEngine('beam')
+    costs = []
+    for width in [1, 2, 5]:
+        se.set_beam(width)
+        result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+        costs.append(result.cost)
+        check("beam search of width {} keeps at most {} nodes per depth".format(width, width),
+              result and len(result.actions) == result.cost and result.nodes_expanded <= 1 + 6*width*result.cost)
+    check("wider beams find cheaper WaterJugs solutions", costs == [12, 8, 5])
+    check("beam search describes itself as such", 'beam (width 5, by h)' in result.strategy)
+
+    waterjugs_set_goal(2, 1)
+    se.set_beam(3, 'f')
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function)
+    check("a failed beam search says a solution may still exist", "may still exist" in out.getvalue())
+
+    se.set_beam(10)
+    result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    check("beam search solves rushhour", result and result.cost == 3)
+
+
+def test_hda_star():
+    print("Now testing hda_star:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    result = hda_star(s0, waterjugs_goal_fn, waterjugs_h_max_function, processes=3, batch_size=2,
+                      initializer=waterjugs_set_goal, initargs=(2, 0))
+    check("hda_star finds an optimal WaterJugs solution with its path",
+          result and result.cost == 5 and len(result.actions) == 5 and
+          result.goal.parent.gval == 4 and 'hda_star with 3 processes' in result.strategy)
+    waterjugs_set_goal(2, 1)
+    result = hda_star(s0, waterjugs_goal_fn, processes=2,
+                      initializer=waterjugs_set_goal, initargs=(2, 1))
+    check("hda_star terminates on an unreachable WaterJugs goal",
+          not result and result.exhausted is None and result.nodes_expanded == 14)
+
+    astar = SearchEngine('astar', 'full').search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    for processes in [1, 4]:
+        result = hda_star(rushhour_small(), rushhour_goal_fn, heur_min_moves, processes=processes)
+        check("hda_star with {} processes finds an optimal rushhour solution".format(processes),
+              result and result.cost == astar.cost and len(result.actions) == astar.cost)
+
+
+def test_lazy_heuristic():
+    print("Now testing lazy heuristic evaluation:")
+    calls = [0]
+    def counting_h(state):
+        calls[0] += 1
+        return heur_min_moves(state)
+
+    for (strategy, cc) in [('astar', 'full'), ('astar', 'path'), ('best_first', 'full')]:
+        for ot in ['heap', 'indexed', 'bucket']:
+            se = SearchEngine(strategy, cc)
+            se.set_open_type(ot)
+            eager = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+            se.set_lazy_heuristic()
+            calls[0] = 0
+            lazy = se.search(rushhour_small(), rushhour_goal_fn, counting_h, quiet=True)
+            check("lazy {}/{} search with a {} OPEN finds a solution".format(strategy, cc, ot) +
+                  (" as cheap" if strategy == 'astar' else ""),
+                  lazy and (strategy == 'best_first' or lazy.cost == eager.cost))
+            check("lazy {}/{} search with a {} OPEN counts its heuristic calls".format(strategy, cc, ot),
+                  lazy.heuristic_calls == calls[0] and lazy.heuristic_calls + lazy.heuristic_saved == lazy.nodes_expanded and
+                  lazy.heuristic_saved > 0 and eager.heuristic_calls is None)
+
+    se = SearchEngine('astar', 'full')
+    se.set_lazy_heuristic()
+    result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True, node_limit=10)
+    check("a lazy search stopped by its budget reports an evaluated best state",
+          result.exhausted == 'node_limit' and result.best_hval == heur_min_moves(result.best))
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+    check("lazy astar finds an optimal WaterJugs solution", result and result.cost == 5)
+
+
+def test_pea_star():
+    print("Now testing the 'pea_star' strategy:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    for cc in ['full', 'path', 'none']:
+        se = SearchEngine('pea_star', cc)
+        result = se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+        check("pea_star with {} cycle checking finds an optimal WaterJugs solution".format(cc),
+              result and result.cost == 5 and len(result.actions) == 5)
+
+    for ot in ['heap', 'indexed', 'bucket']:
+        se = SearchEngine('astar', 'full')
+        se.set_open_type(ot)
+        astar = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+        se.set_strategy('pea_star')
+        result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+        check("pea_star with a {} OPEN finds an optimal rushhour solution with a smaller OPEN".format(ot),
+              result and result.cost == astar.cost and result.max_open < astar.max_open and
+              result.nodes_expanded < astar.nodes_expanded)
+
+    se = SearchEngine('pea_star')
+    waterjugs_set_goal(2, 1)
+    check("pea_star fails on an unreachable WaterJugs goal",
+          not se.search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True))
+    result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True, node_limit=3)
+    check("pea_star stops at its node limit with an evaluated best state",
+          result.exhausted == 'node_limit' and result.best_hval == heur_min_moves(result.best))
+
+
+def test_compact_actions():
+    print("Now testing compact actions:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    check("WaterJugs successors store their actions as small integers",
+          [succ.action for succ in s0.successors()] == [FILL3, FILL4] and
+          [succ.action_name() for succ in s0.successors()] == ['Fill 3 Gallon', 'Fill 4 Gallon'])
+    waterjugs_set_goal(2, 0)
+    result = SearchEngine('astar', 'full').search(s0, waterjugs_goal_fn, waterjugs_h_max_function, quiet=True)
+    check("SearchResult.actions renders compact actions as text",
+          result.actions == ['Fill 3 Gallon', 'Pour 3 into 4', 'Fill 3 Gallon', 'Pour 3 into 4', 'Empty 4 Gallon'])
+
+    first = rushhour_small().successors()
+    second = rushhour_small().successors()
+    check("rushhour successors share one action tuple per move",
+          all(a.action is b.action for (a, b) in zip(first, second)) and
+          first[0].action_name() == "move_vehicle({}, '{}')".format(*first[0].action))
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        first[0].print_state()
+    check("rushhour prints compact actions as text",
+          out.getvalue().startswith('Action= "move_vehicle({}, \'{}\')"'.format(*first[0].action)))
+    check("a state's action_name is str(action) by default",
+          StateSpace(7, 0, None).action_name() == '7')
+
+
+def test_bidirectional():
+    print("Now testing the 'bidirectional' strategy:")
+    s0 = WaterJugs("START", 0, 0, 0)
+    predecessors = [(p.action, p.hashable_state()) for p in WaterJugs("S", 0, 0, 4).predecessors()]
+    check("WaterJugs predecessors are the states with self as a successor",
+          sorted(predecessors) == sorted((q.action, (x, y)) for x in range(4) for y in range(5)
+                                         for q in WaterJugs("P", 0, x, y).successors()
+                                         if q.hashable_state() == (0, 4)))
+    waterjugs_set_goal(2, 0)
+    se = SearchEngine('bidirectional')
+    se.set_bidirectional(waterjugs_goal_state())
+    result = se.search(s0, waterjugs_goal_fn, quiet=True)
+    check("bidirectional search finds an optimal WaterJugs solution",
+          result and result.cost == 5 and
+          result.actions == ['Fill 3 Gallon', 'Pour 3 into 4', 'Fill 3 Gallon', 'Pour 3 into 4', 'Empty 4 Gallon'] and
+          result.goal.hashable_state() == (2, 0) and result.goal.parent.gval == 4)
+    def h_from_start(state):
+        #every state but the initial one is at least one action away from it
+        return 0 if state.hashable_state() == (0, 0) else 1
+    se.set_bidirectional([waterjugs_goal_state(), WaterJugs("GOAL", 0, 2, 4)], h_from_start)
+    result = se.search(s0, waterjugs_goal_fn, quiet=True)
+    check("bidirectional search with a backward heuristic and two goal states finds the nearest",
+          result and result.cost == 4 and result.goal.hashable_state() == (2, 4))
+    waterjugs_set_goal(2, 1)
+    se.set_bidirectional(waterjugs_goal_state())
+    check("bidirectional search fails on an unreachable WaterJugs goal",
+          not se.search(s0, waterjugs_goal_fn, quiet=True))
+    se.set_bidirectional(s0)
+    result = se.search(s0, waterjugs_goal_fn, quiet=True)
+    check("bidirectional search from a goal state", result and result.cost == 0)
+
+    astar = SearchEngine('astar', 'full').search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    goal = make_init_state((7, 7), astar.goal.get_vehicle_statuses(), (4, 1), 'E')
+    se.set_bidirectional(goal)
+    result = se.search(rushhour_small(), rushhour_goal_fn, quiet=True)
+    check("bidirectional search reaches a rushhour goal state optimally",
+          result and result.cost == astar.cost and result.goal.key() == goal.key() and
+          [s.key() for s in result.goal.parent.successors()].count(goal.key()) == 1)
+    undone = [p for p in goal.predecessors()[0].successors() if p.key() == goal.key()]
+    check("undoing a rushhour move gives back the same state", len(undone) == 1)
+
+
+def test_checkpoint():
+    print("Now testing checkpoints:")
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'search.checkpoint')
+    try:
+        cases = [('astar', 'full', 'heap', False), ('astar', 'full', 'indexed', True), ('breadth_first', 'full', 'heap', False),
+                 ('best_first', 'path', 'bucket', False), ('depth_first', 'path', 'heap', False)]
+        for (strategy, cc, ot, lazy) in cases:
+            se = SearchEngine(strategy, cc)
+            se.set_open_type(ot)
+            se.set_lazy_heuristic(lazy)
+            full = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+            se.set_checkpoint(path, 5, rushhour_encode, rushhour_decode)
+            stopped = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True, node_limit=full.nodes_expanded // 2)
+            name = "{}/{}{}".format(strategy, cc, " (lazy)" if lazy else "")
+            check("checkpoints of a {} search go to a single file".format(name),
+                  stopped.exhausted == 'node_limit' and se.checkpoints > 0 and
+                  os.listdir(directory) == ['search.checkpoint'])
+            resumed_se = SearchEngine()
+            resumed_se.set_checkpoint(None, decode=rushhour_decode)
+            resumed = resumed_se.resume(path, rushhour_goal_fn, heur_min_moves, quiet=True)
+            states = [resumed.goal]
+            while states[-1].parent:
+                states.append(states[-1].parent)
+            check("a resumed {} search finds the same solution".format(name),
+                  resumed and resumed.cost == full.cost and resumed.strategy == full.strategy and
+                  states[-1].key() == rushhour_small().key() and
+                  all(s.key() in [t.key() for t in p.successors()] for (s, p) in zip(states, states[1:])) and
+                  (strategy == 'depth_first' or resumed.nodes_expanded == full.nodes_expanded))
+            if lazy:
+                checkpointed = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+                counts = (full.heuristic_calls, full.heuristic_saved)
+                check("checkpoints keep the heuristic counts of a lazy search, also when resumed",
+                      (checkpointed.heuristic_calls, checkpointed.heuristic_saved) == counts and
+                      (resumed.heuristic_calls, resumed.heuristic_saved) == counts)
+
+        se = SearchEngine('depth_first', 'path')
+        se.set_checkpoint(path, 1, rushhour_encode, rushhour_decode)
+        result = se.search(rushhour_small(), rushhour_goal_fn, quiet=True)
+        check("checkpoints are put off while writing them would take too much of the search",
+              result and 0 < se.checkpoints < result.nodes_expanded // 10 and se.checkpoint_time > 0)
+
+        s0 = WaterJugs("START", 0, 0, 0)
+        waterjugs_set_goal(2, 0)
+        se = SearchEngine('breadth_first', 'full')
+        se.set_checkpoint(path, 3)
+        stopped = se.search(s0, waterjugs_goal_fn, quiet=True, node_limit=10)
+        resumed_se = SearchEngine()
+        check("a WaterJugs search checkpointed with whole states resumes",
+              resumed_se.resume(path, waterjugs_goal_fn, quiet=True).cost == 5)
+        se.set_checkpoint(path, 3, waterjugs_encode, waterjugs_decode)
+        se.search(s0, waterjugs_goal_fn, quiet=True, node_limit=10)
+        check("a WaterJugs search checkpointed with encoded states resumes",
+              se.resume(path, waterjugs_goal_fn, quiet=True).cost == 5)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_realtime():
+    print("Now testing the 'lrta_star' strategy:")
+    astar = SearchEngine('astar', 'full').search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    se = SearchEngine('lrta_star')
+    se.set_realtime(5, trials=50)
+    result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    states = [result.goal]
+    while states[-1].parent:
+        states.append(states[-1].parent)
+    check("lrta_star moves a rushhour agent to the goal along successors",
+          result and rushhour_goal_fn(result.goal) and result.cost == len(states) - 1 and
+          all(s.key() in [t.key() for t in p.successors()] for (s, p) in zip(states, states[1:])))
+    check("lrta_star trials converge to an optimal rushhour route", result.cost == astar.cost)
+
+    state = rushhour_small()
+    move = se.realtime_move(state, rushhour_goal_fn, heur_min_moves)
+    check("realtime_move returns a successor within its node budget",
+          move.parent is state and move.key() in [s.key() for s in state.successors()] and
+          se.nodes_expanded < 5 + len(state.successors()))
+    check("realtime_move returns None in a goal state", se.realtime_move(result.goal, rushhour_goal_fn) is None)
+    se.set_realtime(None, 0.01)
+    start = time.perf_counter()
+    moves = 0
+    while state and moves < 100:
+        state = se.realtime_move(state, rushhour_goal_fn, heur_min_moves)
+        moves = moves + 1
+    check("realtime_move with a time budget gives hints that reach the goal",
+          moves < 100 and time.perf_counter() - start < 1.0)
+
+    s0 = WaterJugs("START", 0, 0, 0)
+    waterjugs_set_goal(2, 0)
+    learned = dict()
+    se.set_realtime(3, learned=learned)
+    costs = [se.search(s0, waterjugs_goal_fn, quiet=True).cost for trial in range(30)]
+    check("lrta_star learns WaterJugs hvals across searches until its route is optimal",
+          costs[0] > 5 and costs[-1] == 5 and len(learned) > 0)
+    waterjugs_set_goal(2, 1)
+    se.set_realtime(3)
+    result = se.search(s0, waterjugs_goal_fn, quiet=True, node_limit=2000)
+    check("lrta_star on an unreachable goal stops at its budget",
+          not result and result.exhausted == 'node_limit')
+    def slow_goal_fn(state):
+        time.sleep(0.001)
+        return waterjugs_goal_fn(state)
+    result = se.search(s0, slow_goal_fn, quiet=True, time_limit=0.05)
+    check("lrta_star checks its time limit on every move",
+          not result and result.exhausted == 'time_limit' and result.wall_time < 0.2)
+    se.set_realtime(100)
+    result = se.search(s0, waterjugs_goal_fn, quiet=True)
+    check("lrta_star fails when a lookahead shows the goal unreachable", not result and result.exhausted is None)
+
+
+def test_telemetry():
+    print("Now testing search telemetry:")
+    keys = ['time', 'nodes', 'states_generated', 'nodes_per_sec', 'open', 'cc_dictionary',
+            'bound', 'heuristic_calls', 'heuristic_time', 'rss']
+    for ot in ['heap', 'indexed', 'bucket']:
+        se = SearchEngine('astar', 'full')
+        se.set_open_type(ot)
+        plain = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+        samples = []
+        se.set_telemetry(samples.append, 5)
+        result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+        check("telemetry does not change an astar search with a {} OPEN".format(ot),
+              result.cost == plain.cost and result.nodes_expanded == plain.nodes_expanded)
+        check("astar with a {} OPEN records a telemetry sample every interval nodes and at the end".format(ot),
+              len(samples) > 1 and all(sorted(sample) == sorted(keys) for sample in samples) and
+              all(b['nodes'] - a['nodes'] >= 5 for (a, b) in zip(samples[:-2], samples[1:-1])) and
+              samples[-1]['nodes'] == result.nodes_expanded and
+              samples[-1]['heuristic_calls'] == result.nodes_expanded and
+              all(sample['heuristic_time'] >= 0.0 for sample in samples) and
+              all(sample['cc_dictionary'] > 0 and sample['rss'] > 0 for sample in samples))
+        check("astar telemetry samples record the fval of the next node on OPEN",
+              [sample['bound'] for sample in samples[:-1]] == sorted(sample['bound'] for sample in samples[:-1]) and
+              samples[-1]['bound'] == result.cost)
+
+    se = SearchEngine('astar', 'full')
+    se.set_lazy_heuristic()
+    plain = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    samples = []
+    se.set_telemetry(samples.append, 5)
+    result = se.search(rushhour_small(), rushhour_goal_fn, heur_min_moves, quiet=True)
+    calls = [sample['heuristic_calls'] for sample in samples]
+    check("telemetry does not change the heuristic counts of a lazy search",
+          len(samples) > 2 and
+          (result.heuristic_calls, result.heuristic_saved) == (plain.heuristic_calls, plain.heuristic_saved) and
+          calls == sorted(calls) and calls[-1] == result.heuristic_calls)
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'telemetry.jsonl')
+    try:
+        se = SearchEngine('depth_first', 'path')
+        se.set_telemetry(path, 10)
+        result = se.search(rushhour_small(), rushhour_goal_fn, quiet=True)
+        with open(path) as f:
+            samples = [json.loads(line) for line in f]
+        check("telemetry samples are written to a JSON lines file",
+              result and len(samples) > 1 and
+              samples[-1]['nodes'] == result.nodes_expanded and
+              all(sample['cc_dictionary'] is None and sample['bound'] is None for sample in samples))
+        se = SearchEngine('breadth_first', 'full')
+        se.set_telemetry(path, 10)
+        se.set_checkpoint(os.path.join(directory, 'search.checkpoint'), 7)
+        result = se.search(rushhour_small(), rushhour_goal_fn, quiet=True)
+        with open(path) as f:
+            samples = [json.loads(line) for line in f][len(samples):]
+        check("telemetry and checkpoints can be used together",
+              result and se.checkpoints > 0 and samples[-1]['nodes'] == result.nodes_expanded and
+              all(sample['bound'] <= result.cost for sample in samples))
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_rushhour_bitboard():
+    print("Now testing the compact rushhour states:")
+    vehicles = [['gv', (3, 0), 2, True, True], ['1', (1, 1), 2, False, False], ['2', (0, 1), 2, False, False]]
+    s = make_init_state((3, 4), vehicles, (1, 0), 'E')
+    check("rushhour states list their vehicles in the usual format",
+          s.get_vehicle_statuses() == vehicles and s.get_board_properties() == ((3, 4), (1, 0), 'E'))
+    check("rushhour states share their puzzle and keep an occupancy bitmask",
+          s.puzzle is make_init_state((3, 4), vehicles, (1, 0), 'E').puzzle and
+          s.occupied == (1 << 3) | (1 << 0) | (1 << 5) | (1 << 9) | (1 << 4) | (1 << 8))
+    moves = dict((succ.action, succ) for succ in s.successors())
+    check("rushhour vehicles can't move into a vehicle wrapped around the edge of the board",
+          sorted(moves) == [('1', 'N'), ('1', 'S'), ('gv', 'E'), ('gv', 'W')])
+    succ = moves[('gv', 'W')]
+    check("rushhour vehicles wrap around the edges of the board",
+          succ.get_vehicle_statuses()[0] == ['gv', (0, 0), 2, True, True] and
+          succ.occupied == (1 << 0) | (1 << 1) | (1 << 5) | (1 << 9) | (1 << 4) | (1 << 8) and
+          rushhour_goal_fn(succ) and heur_min_moves(succ) == 0 and heur_min_moves(s) == 1)
+    copy = pickle.loads(pickle.dumps(succ))
+    check("pickled rushhour states get back their shared puzzle",
+          copy.puzzle is s.puzzle and copy.key() == succ.key() and copy.occupied == succ.occupied)
+    other = make_init_state((3, 4), vehicles, (1, 0), 'W')
+    learned = dict()
+    se = SearchEngine()
+    se.set_realtime(3, learned=learned)
+    se.realtime_move(s, rushhour_goal_fn, heur_min_moves)
+    se.realtime_move(other, rushhour_goal_fn, heur_min_moves)
+    check("rushhour states of different puzzles share keys but learn lrta_star hvals apart",
+          other.key() == s.key() and other.problem() is not s.problem() and
+          set(learned) == set([s.puzzle, other.puzzle]) and learned[s.puzzle] is not learned[other.puzzle])
+    puzzle = weakref.ref(other.puzzle)
+    del other, learned, se      #the learned hvals hold their puzzles too
+    gc.collect()
+    check("a rushhour puzzle is dropped with the last of its states", puzzle() is None)
+
+if __name__ == '__main__':
+    test_ida_star()
+    test_indexed_open()
+    test_bucket_open()
+    test_quiet_search()
+    test_budgets()
+    test_anytime_astar()
+    test_portfolio_search()
+    test_batch_search()
+    test_heuristic_cache()
+    test_incremental_path_checking()
+    test_state_keys()
+    test_concurrent_searches()
+    test_external_astar()
+    test_frontier_bfs()
+    test_beam()
+    test_hda_star()
+    test_lazy_heuristic()
+    test_pea_star()
+    test_compact_actions()
+    test_bidirectional()
+    test_checkpoint()
+    test_realtime()
+    test_telemetry()
+    test_rushhour_bitboard()
+
+    print("--------------------------------")
+    if passedTests == totalTests:
+        print("All {} tests passed.".format(totalTests))
+    else:
+        print("{} of {} tests failed. Go back and check the output.".format(totalTests - passedTests, totalTests))